@@ -0,0 +1,90 @@
+"""
+Benchmark runner.
+
+    python -m benchmarks                                   # micro + orchestrator
+    python -m benchmarks --suites micro,orchestrator,e2e,vectorizers --output bench.json
+    python -m benchmarks --baseline bench.json             # compare, exit 1 on regression
+
+Every benchmark reports p50_ms; a run regresses when any p50 is more than
+--tolerance slower than the baseline's and by at least --min-delta-ms.
+"""
+import argparse, json, platform, sys, time
+
+SUITES = ("micro", "orchestrator", "e2e", "vectorizers")
+
+
+def run_suites(suites, iterations: int, latency_ms: float) -> dict:
+    results = {}
+    if "micro" in suites:
+        from benchmarks import micro
+        results.update({f"micro.{k}": v for k, v in micro.run(iterations).items()})
+    if "orchestrator" in suites:
+        from benchmarks import orchestrator
+        results.update({f"orchestrator.{k}": v for k, v in orchestrator.run(max(50, iterations // 2)).items()})
+    if "vectorizers" in suites:
+        from benchmarks import vectorizers
+        results.update({f"vectorizers.{k}": v for k, v in vectorizers.run().items()})
+    if "e2e" in suites:
+        from benchmarks import load_test
+        for r in load_test.run(latency_ms=latency_ms, requests=200, concurrency=[1, 20]):
+            results[f"e2e.chat_c{r['concurrency']}"] = r
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float = 0.0) -> list:
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("p50_ms"):
+            continue
+        change = current["p50_ms"] / base["p50_ms"] - 1
+        current["p50_change"] = round(change, 4)
+        if change > tolerance and current["p50_ms"] - base["p50_ms"] >= min_delta_ms:
+            regressions.append(f"{name}: p50 {base['p50_ms']}ms -> {current['p50_ms']}ms (+{change:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suites", default="micro,orchestrator")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=200, help="fake Ollama latency for e2e")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="results JSON from a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed p50 slowdown (0.10 = 10%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.005,
+                        help="ignore p50 slowdowns smaller than this (timer noise on sub-us benchmarks)")
+    args = parser.parse_args()
+
+    suites = [s.strip() for s in args.suites.split(",") if s.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(sorted(unknown))}")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": run_suites(suites, args.iterations, args.latency_ms),
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report["results"], json.load(f), args.tolerance, args.min_delta_ms)
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
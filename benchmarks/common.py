@@ -0,0 +1,36 @@
+"""Timing helpers shared by the benchmark suites."""
+import statistics, time
+from typing import Any, Callable, Dict
+
+def summarize(samples_s, total_s: float | None = None) -> Dict[str, float]:
+    samples = sorted(samples_s)
+    total = total_s if total_s is not None else sum(samples)
+    return {
+        "iterations": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 6),
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 6),
+        "p95_ms": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))] * 1000, 6),
+        "ops_per_s": round(len(samples) / total, 1) if total else 0.0,
+    }
+
+
+def measure(func: Callable[[], Any], iterations: int = 1000, warmup: int = 50) -> Dict[str, float]:
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples)
+
+
+async def measure_async(func: Callable[[], Any], iterations: int = 1000, warmup: int = 50) -> Dict[str, float]:
+    for _ in range(warmup):
+        await func()
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples)
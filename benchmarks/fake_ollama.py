@@ -0,0 +1,59 @@
+"""
+Minimal stand-in for the Ollama HTTP API used by benchmarks and load tests.
+Every call sleeps for FAKE_OLLAMA_LATENCY_MS before answering, so the chatbot
+can be exercised end-to-end without a GPU.
+
+    uvicorn benchmarks.fake_ollama:app --port 11434
+"""
+import asyncio, os
+import json
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from core.embeddings import LocalEmbedder
+
+LATENCY_MS = float(os.getenv("FAKE_OLLAMA_LATENCY_MS", "500"))
+
+app = FastAPI(title="Fake Ollama")
+
+
+@app.get("/api/version")
+async def version():
+    return {"version": "fake"}
+
+
+@app.post("/api/chat")
+async def chat(request: Request):
+    body = await request.json()
+    last = body["messages"][-1]["content"] if body.get("messages") else ""
+    if body.get("stream"):
+        return StreamingResponse(_stream_reply(body.get("model"), f"(fake) You said: {last}"),
+                                 media_type="application/x-ndjson")
+    await asyncio.sleep(LATENCY_MS / 1000)
+    return {"model": body.get("model"), "done": True,
+            "message": {"role": "assistant", "content": f"(fake) You said: {last}"}}
+
+
+async def _stream_reply(model, text):
+    """Emit the reply word by word, spreading LATENCY_MS across the tokens."""
+    words = text.split(" ")
+    for i, word in enumerate(words):
+        await asyncio.sleep(LATENCY_MS / 1000 / len(words))
+        token = word if i == 0 else " " + word
+        yield json.dumps({"model": model, "done": False,
+                          "message": {"role": "assistant", "content": token}}) + "\n"
+    yield json.dumps({"model": model, "done": True, "message": {"role": "assistant", "content": ""}}) + "\n"
+
+
+@app.post("/api/generate")
+async def generate(request: Request):
+    body = await request.json()
+    await asyncio.sleep(LATENCY_MS / 1000)
+    return {"model": body.get("model"), "done": True, "response": "payment_promised"}
+
+
+@app.post("/api/embed")
+async def embed(request: Request):
+    body = await request.json()
+    texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    await asyncio.sleep(LATENCY_MS / 1000 / 10)
+    return {"model": body.get("model"), "embeddings": LocalEmbedder().embed(texts).tolist()}
@@ -0,0 +1,114 @@
+"""
+Concurrency load test: runs the chatbot API against benchmarks.fake_ollama and
+fires /chat requests at increasing concurrency levels.
+
+    python -m benchmarks.load_test --latency-ms 500 --requests 400 --concurrency 1,50,200
+
+With a fixed upstream latency L, throughput should scale ~linearly with
+concurrency (ideal = concurrency / L) as long as the event loop is not blocked,
+up to LLM_MAX_CONCURRENCY concurrent Ollama calls; beyond the scheduler's
+queue, requests are rejected with 503 and counted as "rejected". Coalescing of
+identical LLM calls is disabled (LLM_COALESCE_ENABLED=0) unless set in the
+environment, so the repeated messages measure concurrency, not single-flight.
+"""
+import argparse, asyncio, os, statistics, subprocess, sys, time
+import httpx
+
+MESSAGES = ["Pay via UPI", "show my emi breakdown", "what is my outstanding loan balance",
+            "can I extend my due date", "how to pay emi", "what's the weather today"]
+
+
+def start_server(target: str, port: int, env: dict) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", target, "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{target} did not start on port {port}")
+
+
+async def run_level(base_url: str, n_requests: int, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies, rejected = [], []
+
+    async def one(i: int, client: httpx.AsyncClient):
+        async with sem:
+            t0 = time.perf_counter()
+            resp = await client.post(f"{base_url}/chat", json={
+                "message": MESSAGES[i % len(MESSAGES)], "session_id": f"load-{i}"})
+            if resp.status_code == 503:
+                rejected.append(i)
+                return
+            resp.raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i, client) for i in range(n_requests)))
+        elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "rejected": len(rejected),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1) if latencies else None,
+    }
+
+
+def run(latency_ms: float = 500, requests: int = 400, concurrency=(1, 50, 200),
+        ollama_port: int = 18434, api_port: int = 18080) -> list:
+    env = dict(os.environ,
+               FAKE_OLLAMA_LATENCY_MS=str(latency_ms),
+               OLLAMA_CHAT_URL=f"http://127.0.0.1:{ollama_port}/api/chat",
+               OLLAMA_URL=f"http://127.0.0.1:{ollama_port}/api/generate")
+    env.setdefault("OLLAMA_MAX_CONNECTIONS", "1000")
+    env.setdefault("OLLAMA_MAX_KEEPALIVE", "1000")
+    env.setdefault("LOG_LEVEL", "WARNING")
+    env.setdefault("LLM_COALESCE_ENABLED", "0")
+
+    servers = [start_server("benchmarks.fake_ollama:app", ollama_port, env),
+               start_server("main:app", api_port, env)]
+    try:
+        results = []
+        for level in concurrency:
+            n = max(level, min(requests, level * 4)) if level > 1 else min(requests, 10)
+            results.append(asyncio.run(run_level(f"http://127.0.0.1:{api_port}", n, level)))
+    finally:
+        for proc in servers:
+            proc.terminate()
+            proc.wait()
+
+    base = results[0]["throughput_rps"]
+    for r in results:
+        r["speedup_vs_first"] = round(r["throughput_rps"] / base, 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", default="1,50,200")
+    parser.add_argument("--ollama-port", type=int, default=18434)
+    parser.add_argument("--api-port", type=int, default=18080)
+    args = parser.parse_args()
+
+    for r in run(args.latency_ms, args.requests, [int(c) for c in args.concurrency.split(",")],
+                 args.ollama_port, args.api_port):
+        print(r)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""Microbenchmarks for the per-message hot path: classification and prompt building."""
+from typing import Dict
+from benchmarks.common import measure
+
+MESSAGES = [
+    "Pay via UPI", "show my emi breakdown", "what is my outstanding loan balance",
+    "can I extend my due date", "I can't pay this month", "how to pay emi",
+    "reset my password", "what's the weather today", "thank you", "link my bank account",
+]
+
+
+def run(iterations: int = 1000) -> Dict[str, Dict[str, float]]:
+    from core.orchestrator import get_classifier, build_system_prompt
+    from core.static_data import get_loan_details
+
+    classifier = get_classifier()
+    results = {}
+    i = iter(range(10 ** 9))
+    results["classify"] = measure(lambda: classifier.classify(MESSAGES[next(i) % len(MESSAGES)]),
+                                  iterations)
+    batch = MESSAGES * 10
+    results["classify_many_100"] = measure(lambda: classifier.classify_many(batch), max(10, iterations // 50))
+    results["build_system_prompt"] = measure(
+        lambda: build_system_prompt("loan_balance", get_loan_details()), iterations)
+    results["build_system_prompt_off_domain"] = measure(
+        lambda: build_system_prompt("other", off_domain=True), iterations)
+    return results
@@ -0,0 +1,27 @@
+"""process_user_query throughput with the LLM stubbed out (no network, no Ollama)."""
+import asyncio
+from typing import Dict
+from benchmarks.common import measure_async
+from benchmarks.micro import MESSAGES
+from core.llm_scheduler import PRIORITY_DEFAULT
+
+async def _fake_call_llm(system_prompt: str, user_message: str, session_id: str = "default",
+                         priority: int = PRIORITY_DEFAULT) -> str:
+    return "stubbed reply"
+
+
+def run(iterations: int = 500) -> Dict[str, Dict[str, float]]:
+    import core.orchestrator as orchestrator
+
+    original = orchestrator.call_llm
+    orchestrator.call_llm = _fake_call_llm
+    try:
+        i = iter(range(10 ** 9))
+
+        async def one_turn():
+            n = next(i)
+            await orchestrator.process_user_query(MESSAGES[n % len(MESSAGES)], session_id=f"bench-{n % 100}")
+
+        return {"process_user_query": asyncio.run(measure_async(one_turn, iterations))}
+    finally:
+        orchestrator.call_llm = original
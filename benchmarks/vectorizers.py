@@ -0,0 +1,67 @@
+"""
+Compares the IntentClassifier vectorizer backends (core.vectorizers) for
+accuracy on the evaluation corpus, per-message latency, build time and peak
+RSS. Each backend runs in a fresh interpreter so RSS and import cost are not
+shared between them.
+
+    python -m benchmarks.vectorizers
+"""
+import json, os, subprocess, sys
+from typing import Dict
+
+BACKENDS = {
+    "tfidf": {"INTENT_VECTORIZER": "tfidf"},
+    "hashed_word": {"INTENT_VECTORIZER": "hashed", "INTENT_VECTORIZER_ANALYZER": "word"},
+    "hashed_char_wb": {"INTENT_VECTORIZER": "hashed", "INTENT_VECTORIZER_ANALYZER": "char_wb"},
+    "embedding_local": {"INTENT_VECTORIZER": "embedding", "EMBEDDING_PROVIDER": "local"},
+    "hybrid_local": {"INTENT_VECTORIZER": "hybrid", "EMBEDDING_PROVIDER": "local"},
+}
+
+
+def _peak_rss_mb() -> float:
+    """VmHWM of this process. Unlike ru_maxrss, which a child inherits from its
+    parent across fork/exec, it starts afresh with the new program."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    raise RuntimeError("VmHWM not found in /proc/self/status")
+
+
+def _child() -> None:
+    import sys, time
+    t0 = time.perf_counter()
+    from core.intent_classifier import IntentClassifier
+    classifier = IntentClassifier()
+    build_s = time.perf_counter() - t0
+
+    from evaluation.evaluate import evaluate, load_corpus
+    report = evaluate(load_corpus(), classifier)
+    print(json.dumps({
+        "accuracy": round(report["accuracy"], 4),
+        "fallback_rate": round(report["fallback_rate"], 4),
+        "p50_ms": report["latency_ms"]["p50"],
+        "p95_ms": report["latency_ms"]["p95"],
+        "import_and_build_ms": round(build_s * 1000, 1),
+        "max_rss_mb": _peak_rss_mb(),
+        "sklearn_imported": "sklearn" in sys.modules,
+        "scipy_imported": "scipy" in sys.modules,
+    }))
+
+
+def run() -> Dict[str, Dict]:
+    results = {}
+    for name, env in BACKENDS.items():
+        out = subprocess.run([sys.executable, "-m", "benchmarks.vectorizers", "--child"],
+                             env=dict(os.environ, LOG_LEVEL="WARNING", **env),
+                             capture_output=True, text=True, check=True)
+        results[name] = json.loads(out.stdout.strip().splitlines()[-1])
+    return results
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        _child()
+    else:
+        for name, result in run().items():
+            print(name, result)
@@ -0,0 +1,63 @@
+"""
+Compile the intent definitions (core.intents) into the on-disk model artifact
+that IntentClassifier loads at startup (format in core.intent_index).
+
+    python -m core.build_intent_model                      # -> $INTENT_INDEX_PATH or intent_index.bin
+    python -m core.build_intent_model --vectorizer hashed --output model.bin
+    python -m core.build_intent_model --check              # exit 1 if missing or stale
+
+The artifact is only rebuilt when the definitions it was compiled from change
+(or with --force); run it in the image build so workers start from a ready model.
+"""
+import argparse, os, sys, time
+
+DEFAULT_OUTPUT = os.getenv("INTENT_INDEX_PATH") or "intent_index.bin"
+
+
+def artifact_status(path: str, vectorizer: str) -> str:
+    """'current', 'stale', 'missing' or 'invalid' for the artifact at path."""
+    from core.intent_index import definitions_hash, read_index
+    from core.intents import INTENTS
+    from core.vectorizers import fingerprint
+
+    if not os.path.exists(path):
+        return "missing"
+    try:
+        _, meta = read_index(path)
+    except (ValueError, KeyError, OSError):
+        return "invalid"
+    return "current" if meta.get("source_hash") == definitions_hash(INTENTS, fingerprint(vectorizer)) else "stale"
+
+
+def main(argv=None) -> int:
+    from core.vectorizers import INTENT_VECTORIZER, VECTORIZERS
+
+    parser = argparse.ArgumentParser(prog="python -m core.build_intent_model", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--vectorizer", default=INTENT_VECTORIZER, choices=sorted(VECTORIZERS))
+    parser.add_argument("--force", action="store_true", help="rebuild even if the artifact is current")
+    parser.add_argument("--check", action="store_true", help="only report; exit 1 unless current")
+    args = parser.parse_args(argv)
+
+    status = artifact_status(args.output, args.vectorizer)
+    if args.check or (status == "current" and not args.force):
+        print(f"{args.output}: {status}")
+        return 0 if status == "current" else 1
+
+    from core.intent_classifier import IntentClassifier
+
+    t0 = time.perf_counter()
+    classifier = IntentClassifier(vectorizer=args.vectorizer, index_path="")
+    classifier.save_model(args.output)
+    print(f"{args.output}: built model {classifier.model_version} ({args.vectorizer}, "
+          f"{os.path.getsize(args.output)} bytes) in {time.perf_counter() - t0:.2f}s (was {status})")
+
+    t0 = time.perf_counter()
+    IntentClassifier(vectorizer=args.vectorizer, index_path=args.output)
+    print(f"{args.output}: loads in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Circuit breakers for the Ollama-backed models, so an outage costs one timeout
+rather than one per request.
+
+    closed     calls go through; CIRCUIT_FAILURE_THRESHOLD consecutive failures open it
+    open       calls are refused at once (callers use their fallback) for
+               CIRCUIT_RESET_SECONDS
+    half_open  one probe call is let through: success closes the breaker,
+               failure opens it again
+
+State per upstream is reported on /health.
+"""
+import os, threading, time
+from typing import Any, Dict
+from core.metrics import metrics
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_started: float | None = None
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str) -> None:
+        self.state = state
+        metrics.inc("circuit_breaker_transitions_total", upstream=self.name, state=state)
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now; counts refusals."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.reset_seconds:
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                # one probe at a time; a probe that never reported back is replaced
+                if self._probe_started is None or now - self._probe_started >= self.reset_seconds:
+                    self._probe_started = now
+                    return True
+            elif self.state == CLOSED:
+                return True
+        metrics.inc("circuit_breaker_rejected_total", upstream=self.name)
+        return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probe_started = None
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_started = None
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def release(self) -> None:
+        """Forget an allowed call that never got an answer from the upstream (rejected
+        by the scheduler, cancelled), so a half-open probe is not left pending."""
+        with self._lock:
+            self._probe_started = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        info: Dict[str, Any] = {"state": self.state, "consecutive_failures": self.failures}
+        if self.state == OPEN:
+            info["retry_in_seconds"] = round(max(0.0, self.opened_at + self.reset_seconds - time.monotonic()), 1)
+        return info
+
+
+breakers = {"llm": CircuitBreaker("llm"), "disposition": CircuitBreaker("disposition")}
@@ -0,0 +1,58 @@
+"""
+Keeps the chat history sent to the LLM inside a fixed token budget so prompt
+size (and latency) stays flat over long conversations. The newest turns are
+kept verbatim; older ones are dropped and, optionally, replaced by a one-line
+summary of what the user asked about.
+"""
+import os
+from typing import Dict, List
+
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "1024"))
+CONTEXT_SUMMARIZE = os.getenv("CONTEXT_SUMMARIZE", "1") == "1"
+SUMMARY_MAX_CHARS = 300
+SUMMARY_MAX_QUESTIONS = 5
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for English with gemma/llama tokenizers
+    return len(text) // 4 + 1
+
+
+def summarize_turns(turns: List[Dict[str, str]]) -> str:
+    asked = [t["content"].strip() for t in turns if t["role"] == "user" and t["content"].strip()]
+    # the most recent dropped questions are the most likely to still matter
+    asked = asked[-SUMMARY_MAX_QUESTIONS:]
+    summary = "Earlier in this conversation the user asked about: " + "; ".join(asked)
+    if len(summary) > SUMMARY_MAX_CHARS:
+        summary = summary[:SUMMARY_MAX_CHARS - 3] + "..."
+    return summary
+
+
+def build_messages(system_prompt: str, history: List[Dict[str, str]], user_message: str,
+                   max_tokens: int = CONTEXT_MAX_TOKENS,
+                   summarize: bool = CONTEXT_SUMMARIZE) -> List[Dict[str, str]]:
+    """
+    Return [system, (summary), recent history..., user] such that the history
+    part fits in whatever budget the system prompt and user message leave.
+    """
+    budget = max_tokens - estimate_tokens(system_prompt) - estimate_tokens(user_message)
+    if summarize:
+        budget -= estimate_tokens(" " * SUMMARY_MAX_CHARS)
+
+    start = len(history)
+    while start > 0:
+        cost = estimate_tokens(history[start - 1]["content"])
+        if cost > budget:
+            break
+        budget -= cost
+        start -= 1
+    # never open the window on an assistant reply without its question
+    if start < len(history) and history[start]["role"] == "assistant":
+        start += 1
+
+    messages = [{"role": "system", "content": system_prompt}]
+    if start > 0 and summarize:
+        messages.append({"role": "system", "content": summarize_turns(history[:start])})
+    messages.extend(history[start:])
+    messages.append({"role": "user", "content": user_message})
+    return messages
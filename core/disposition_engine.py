@@ -0,0 +1,164 @@
+"""
+Local disposition engine: maps a conversation's intent sequence to a final
+disposition without an LLM round trip. The sequence is summarised in a small
+state that is updated in O(1) per classified intent, so a provisional
+disposition is available after every turn and /end only reads the last one.
+
+- rules (default): core.disposition_rules, with a confidence that drops when
+  the conversation holds conflicting evidence (e.g. a promise and a refusal).
+- model: multinomial logistic regression over intent-sequence features
+  (intent frequencies, last intent, length, payment/refusal flags), trained
+  with `python -m evaluation.disposition train` and saved as plain NumPy
+  arrays, so inference is one matrix-vector product and needs no scikit-learn.
+
+    DISPOSITION_MODEL_PATH=disposition_model.npz    use the trained model instead of the rules
+    CONVERSATION_EXPORT_PATH=conversations.jsonl    append every ended conversation (training data)
+"""
+import json, logging, os, time
+from typing import Any, Dict, List, Sequence
+import numpy as np
+from core.disposition_rules import DISPOSITION_RULES, NO_ENGAGEMENT, rule_based_disposition
+
+DISPOSITION_MODEL_PATH = os.getenv("DISPOSITION_MODEL_PATH")
+CONVERSATION_EXPORT_PATH = os.getenv("CONVERSATION_EXPORT_PATH")
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_INTENTS = DISPOSITION_RULES[0][1]
+REFUSAL_INTENTS = {"not_willing_to_pay"}
+
+_CATEGORY = {intent: label for label, intents in DISPOSITION_RULES for intent in intents}
+
+
+def empty_state() -> Dict[str, Any]:
+    return {"n": 0, "counts": {}, "last": None, "last_category": None, "last_payment": -1, "last_refusal": -1}
+
+
+def update_state(state: Dict[str, Any], intent: str) -> Dict[str, Any]:
+    """Fold one more intent into a conversation state, in O(1); state stays JSON-serialisable."""
+    state["counts"][intent] = state["counts"].get(intent, 0) + 1
+    state["last"] = intent
+    if intent in _CATEGORY:
+        state["last_category"] = _CATEGORY[intent]
+    if intent in PAYMENT_INTENTS:
+        state["last_payment"] = state["n"]
+    if intent in REFUSAL_INTENTS:
+        state["last_refusal"] = state["n"]
+    state["n"] += 1
+    return state
+
+
+def fold(intent_list: Sequence[str]) -> Dict[str, Any]:
+    state = empty_state()
+    for intent in intent_list:
+        update_state(state, intent)
+    return state
+
+
+def features_from_state(state: Dict[str, Any], index: Dict[str, int]) -> np.ndarray:
+    """[intent frequencies | last intent one-hot | log length, has payment, has refusal, refused last],
+    with ``index`` mapping each intent name to its position."""
+    n = len(index)
+    x = np.zeros(2 * n + 4)
+    for intent, count in state["counts"].items():
+        if intent in index:
+            x[index[intent]] = count / state["n"]
+    if state["last"] in index:
+        x[n + index[state["last"]]] = 1.0
+    x[2 * n:] = [np.log1p(state["n"]), state["last_payment"] >= 0, state["last_refusal"] >= 0,
+                 state["last_refusal"] > state["last_payment"]]
+    return x
+
+
+def features(intent_list: Sequence[str], index: Dict[str, int]) -> np.ndarray:
+    return features_from_state(fold(intent_list), index)
+
+
+def rules_from_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    label = rule_based_disposition(list(state["counts"]))
+    categories = {_CATEGORY[i] for i in state["counts"] if i in _CATEGORY}
+    if len(categories) <= 1:
+        confidence = 1.0 if label == NO_ENGAGEMENT else 0.9
+    else:
+        # conflicting evidence: trust precedence more when the latest decisive intent agrees
+        confidence = 0.75 if state["last_category"] == label else 0.5
+    return {"disposition": label, "confidence": confidence}
+
+
+def rules_prediction(intent_list: Sequence[str]) -> Dict[str, Any]:
+    return rules_from_state(fold(intent_list))
+
+
+class DispositionModel:
+    def __init__(self, classes: List[str], vocabulary: List[str], coef: np.ndarray, intercept: np.ndarray):
+        self.classes = classes
+        self.vocabulary = vocabulary
+        self.coef = coef
+        self.intercept = intercept
+        self._index = {name: i for i, name in enumerate(vocabulary)}
+
+    def predict_state(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        logits = self.coef @ features_from_state(state, self._index) + self.intercept
+        probs = np.exp(logits - logits.max())
+        probs /= probs.sum()
+        best = int(np.argmax(probs))
+        return {"disposition": self.classes[best], "confidence": float(probs[best])}
+
+    def predict(self, intent_list: Sequence[str]) -> Dict[str, Any]:
+        return self.predict_state(fold(intent_list))
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            np.savez(f, coef=self.coef, intercept=self.intercept,
+                     meta=np.array(json.dumps({"classes": self.classes, "vocabulary": self.vocabulary})))
+
+    @classmethod
+    def load(cls, path: str) -> "DispositionModel":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(meta["classes"], meta["vocabulary"], data["coef"], data["intercept"])
+
+
+class DispositionEngine:
+    def __init__(self, model_path: str | None = DISPOSITION_MODEL_PATH):
+        self.model = DispositionModel.load(model_path) if model_path else None
+        self.name = "model" if self.model else "rules"
+        if self.model:
+            logger.info("Loaded disposition model %s (%d classes)", model_path, len(self.model.classes))
+
+    def predict_state(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """{"disposition", "confidence"} for a conversation state; confidence is in [0, 1]."""
+        if self.model is not None:
+            return self.model.predict_state(state)
+        return rules_from_state(state)
+
+    def predict(self, intent_list: Sequence[str]) -> Dict[str, Any]:
+        return self.predict_state(fold(intent_list))
+
+    def new_state(self) -> Dict[str, Any]:
+        state = empty_state()
+        state["prediction"] = self.predict_state(state)
+        return state
+
+    def update(self, state: Dict[str, Any], intent: str) -> Dict[str, Any]:
+        """A copy of a session's state advanced by one classified intent, with its provisional prediction."""
+        state = {**state, "counts": dict(state["counts"])}
+        update_state(state, intent)
+        state["prediction"] = self.predict_state(state)
+        return state
+
+
+def export_conversation(session_id: str, intent_list: List[str], result: Dict[str, Any],
+                        path: str | None = CONVERSATION_EXPORT_PATH) -> None:
+    """Append an ended conversation as a JSON line; review the labels before training on them."""
+    if not path:
+        return
+    record = {"session_id": session_id, "ended_at": round(time.time(), 3), "intents": intent_list, **result}
+    try:
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        logger.warning("Could not export conversation %s: %s", session_id, e)
+
+
+disposition_engine = DispositionEngine()
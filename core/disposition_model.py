@@ -1,16 +1,58 @@
-import httpx, json, os
-from typing import List
+import asyncio, json, os
+from typing import Any, Dict, List
+from core.http_client import get_async_client, make_timeout
+from core.metrics import metrics, record_error
+from core.llm_scheduler import llm_scheduler, LLMOverloaded, PRIORITY_END
+from core.circuit_breaker import breakers
+from core.disposition_engine import disposition_engine
 
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/generate")
 MODEL_NAME = os.getenv("DISPOSITION_MODEL", "disposition-model")
+DISPOSITION_TIMEOUT = float(os.getenv("DISPOSITION_TIMEOUT", "60"))
+# below this local-engine confidence the disposition LLM is asked instead
+DISPOSITION_MIN_CONFIDENCE = float(os.getenv("DISPOSITION_MIN_CONFIDENCE", "0.7"))
 
-def predict_disposition(intent_list: List[str]) -> str:
-    prompt = f"Given these intents, predict final disposition:\n{json.dumps(intent_list, indent=2)}"
+def _local(result: Dict[str, Any], source: str) -> Dict[str, Any]:
+    metrics.inc("disposition_predictions_total", source=source)
+    return {**result, "source": source}
+
+async def predict_disposition(intent_list: List[str], local: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """
+    {"disposition", "confidence", "source"}: the local engine's answer when it
+    is confident enough, otherwise the disposition LLM's ("source": "llm").
+    If the LLM is unavailable or its queue is full, the local answer is used
+    anyway ("fallback").
+    ``local`` is a prediction already tracked for the session, if any.
+    """
+    local = local or disposition_engine.predict(intent_list)
+    if local["confidence"] >= DISPOSITION_MIN_CONFIDENCE:
+        return _local(local, "local")
+
+    breaker = breakers["disposition"]
+    if not breaker.allow():
+        return _local(local, "fallback")
+
+    prompt = f"Given these intents, predict final disposition:\n{json.dumps(intent_list)}"
     try:
-        with httpx.Client(timeout=60) as client:
-            resp = client.post(OLLAMA_URL, json={"model": MODEL_NAME, "prompt": prompt, "stream": False})
-            resp.raise_for_status()
-            data = resp.json()
-            return (data.get("response") or "").strip() or "unknown"
-    except Exception as e:
-        return f"[Error contacting disposition model: {e}]"
+        # /end goes ahead of chat turns in the shared Ollama queue
+        async with llm_scheduler.slot(PRIORITY_END):
+            try:
+                resp = await get_async_client().post(OLLAMA_URL,
+                                                     json={"model": MODEL_NAME, "prompt": prompt, "stream": False},
+                                                     timeout=make_timeout(DISPOSITION_TIMEOUT))
+                resp.raise_for_status()
+                data = resp.json()
+            except Exception as e:
+                record_error("disposition", e)
+                breaker.record_failure()
+                return _local(local, "fallback")
+    except LLMOverloaded:
+        # the local answer is in hand; /end should not 503 on a saturated queue
+        breaker.release()
+        return _local(local, "fallback")
+    except asyncio.CancelledError:
+        breaker.release()
+        raise
+    breaker.record_success()
+    metrics.inc("disposition_predictions_total", source="llm")
+    return {"disposition": (data.get("response") or "").strip() or "unknown", "confidence": None, "source": "llm"}
@@ -0,0 +1,27 @@
+"""
+Rule-based call disposition from the sequence of classified intents, used
+when the disposition model is unavailable. The first rule with an intent in
+the conversation wins, so a payment outranks a promise, a promise outranks a
+refusal, and so on.
+"""
+from typing import List
+
+DISPOSITION_RULES = [
+    ("payment_made", {"make_payment", "make_payment_upi", "make_payment_netbanking", "make_payment_card",
+                      "make_payment_qr", "payment_success"}),
+    ("payment_promised", {"schedule_payment", "schedule_auto_debit", "make_payment_cash",
+                          "request_partial_payment", "reminder_setup"}),
+    ("refused_to_pay", {"not_willing_to_pay"}),
+    ("extension_requested", {"request_extension"}),
+    ("escalated_to_agent", {"talk_to_agent", "complaint_register", "technical_support"}),
+]
+INFORMATION_ONLY = "information_only"
+NO_ENGAGEMENT = "no_engagement"
+
+
+def rule_based_disposition(intent_list: List[str]) -> str:
+    seen = set(intent_list)
+    for disposition, intents in DISPOSITION_RULES:
+        if seen & intents:
+            return disposition
+    return INFORMATION_ONLY if seen - {"other", "greeting", "thanks", "small_talk"} else NO_ENGAGEMENT
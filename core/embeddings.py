@@ -0,0 +1,172 @@
+"""
+Sentence embeddings for the semantic intent backends in core.vectorizers
+("embedding" and "hybrid").
+
+Providers (EMBEDDING_PROVIDER):
+
+- "ollama":                the Ollama /api/embed endpoint (EMBEDDING_MODEL, default nomic-embed-text)
+- "sentence-transformers": a small local CPU model (default all-MiniLM-L6-v2); optional dependency
+- "local":                 dependency-free stand-in for tests and benchmarks: signed feature
+                           hashing of words and character trigrams into EMBEDDING_DIM dims.
+                           It captures spelling overlap, not meaning.
+
+Query embeddings are cached by normalised text (EMBEDDING_CACHE_SIZE entries,
+LRU). Example embeddings are computed once at build time and searched through
+an IVF index: examples are clustered with spherical k-means and a query is only
+compared with the examples of its EMBEDDING_N_PROBE nearest clusters.
+"""
+import os, threading, zlib
+from collections import OrderedDict
+from typing import List, Optional
+import numpy as np
+from core.metrics import metrics
+from core.response_cache import normalize_text
+
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "ollama")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "512"))
+EMBEDDING_URL = os.getenv("OLLAMA_EMBED_URL", "http://localhost:11434/api/embed")
+EMBEDDING_TIMEOUT = float(os.getenv("EMBEDDING_TIMEOUT", "10"))
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_N_PROBE = int(os.getenv("EMBEDDING_N_PROBE", "4"))
+
+DEFAULT_MODELS = {"ollama": "nomic-embed-text", "sentence-transformers": "all-MiniLM-L6-v2", "local": "hashing"}
+
+
+def _l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class LocalEmbedder:
+    def __init__(self, model: str = "hashing", dim: int = EMBEDDING_DIM):
+        self.model = model
+        self.dim = dim
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                padded = f" {word} "
+                features = [word] + [padded[j:j + 3] for j in range(len(padded) - 2)]
+                for feature in features:
+                    h = zlib.crc32(feature.encode())
+                    out[i, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return _l2_normalize(out)
+
+
+class OllamaEmbedder:
+    def __init__(self, model: str = DEFAULT_MODELS["ollama"], url: str = EMBEDDING_URL):
+        self.model = model
+        self.url = url
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        from core.http_client import get_client, make_timeout
+        # classification runs in a worker thread, so the blocking client is fine here
+        resp = get_client().post(self.url, json={"model": self.model, "input": texts},
+                                 timeout=make_timeout(EMBEDDING_TIMEOUT))
+        resp.raise_for_status()
+        return _l2_normalize(np.asarray(resp.json()["embeddings"], dtype=np.float32))
+
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model: str = DEFAULT_MODELS["sentence-transformers"]):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError("EMBEDDING_PROVIDER=sentence-transformers needs "
+                               "`pip install sentence-transformers`") from e
+        self.model = model
+        self._model = SentenceTransformer(model, device="cpu")
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return _l2_normalize(self._model.encode(texts, convert_to_numpy=True).astype(np.float32))
+
+
+EMBEDDERS = {"ollama": OllamaEmbedder, "sentence-transformers": SentenceTransformerEmbedder,
+             "local": LocalEmbedder}
+
+
+def make_embedder(provider: str = EMBEDDING_PROVIDER, model: str = EMBEDDING_MODEL):
+    if provider not in EMBEDDERS:
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER: {provider!r}")
+    return EMBEDDERS[provider](model or DEFAULT_MODELS[provider])
+
+
+class CachedEmbedder:
+    """LRU cache of query embeddings in front of an embedder, keyed by normalised text."""
+
+    def __init__(self, embedder, max_entries: int = EMBEDDING_CACHE_SIZE):
+        self.embedder = embedder
+        self.max_entries = max_entries
+        self.metrics = {"hits": 0, "misses": 0}
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        keys = [normalize_text(t) for t in texts]
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+            missing = list(dict.fromkeys(k for k in keys if k not in found))
+            self.metrics["hits"] += len(keys) - len(missing)
+            self.metrics["misses"] += len(missing)
+        metrics.inc("embedding_cache_lookups_total", len(keys) - len(missing), result="hit")
+        metrics.inc("embedding_cache_lookups_total", len(missing), result="miss")
+
+        if missing:
+            for key, vector in zip(missing, self.embedder.embed(missing)):
+                found[key] = vector
+            with self._lock:
+                for key in missing:
+                    self._entries[key] = found[key]
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return np.stack([found[k] for k in keys])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class IVFIndex:
+    """Inverted-file ANN index over l2-normalised vectors (inner product = cosine)."""
+
+    def __init__(self, vectors: np.ndarray, centroids: np.ndarray,
+                 list_rows: np.ndarray, list_indptr: np.ndarray):
+        self.vectors = vectors
+        self.centroids = centroids
+        self.list_rows = list_rows
+        self.list_indptr = list_indptr
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, n_lists: Optional[int] = None,
+              iterations: int = 10, seed: int = 0) -> "IVFIndex":
+        n = len(vectors)
+        n_lists = max(1, min(n, n_lists or int(np.sqrt(n))))
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(n, n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(vectors @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = vectors[assign == c]
+                if len(members):
+                    centroids[c] = _l2_normalize(members.sum(axis=0, keepdims=True))[0]
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        list_indptr = np.searchsorted(assign[order], np.arange(n_lists + 1))
+        return cls(vectors, centroids, order.astype(np.int32), list_indptr)
+
+    def search(self, queries: np.ndarray, n_probe: int = EMBEDDING_N_PROBE) -> np.ndarray:
+        """Cosine similarity of each query with the examples in its n_probe nearest
+        lists, shape (len(queries), n_examples); examples not visited score 0."""
+        if n_probe >= len(self.centroids):
+            return queries @ self.vectors.T
+        sims = np.zeros((len(queries), len(self.vectors)), dtype=queries.dtype)
+        probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :n_probe]
+        for i, lists in enumerate(probes):
+            rows = np.concatenate([self.list_rows[self.list_indptr[c]:self.list_indptr[c + 1]] for c in lists])
+            sims[i, rows] = self.vectors[rows] @ queries[i]
+        return sims
@@ -0,0 +1,56 @@
+"""
+Shared, pooled HTTP clients for talking to Ollama.
+Created once at app startup (FastAPI lifespan) and closed at shutdown, so every
+LLM / disposition call reuses kept-alive connections instead of dialling anew.
+"""
+import httpx, os
+from typing import Optional
+
+MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OLLAMA_MAX_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", "60"))
+CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+REQUEST_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "60"))
+
+_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=MAX_CONNECTIONS,
+                        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=KEEPALIVE_EXPIRY)
+
+
+def make_timeout(read: Optional[float] = None) -> httpx.Timeout:
+    """Per-request timeout; ``read`` overrides the default read/write/pool timeout."""
+    return httpx.Timeout(read if read is not None else REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT)
+
+
+def get_client() -> httpx.Client:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.Client(limits=_limits(), timeout=make_timeout())
+    return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(limits=_limits(), timeout=make_timeout())
+    return _async_client
+
+
+def start_clients() -> None:
+    get_client()
+    get_async_client()
+
+
+async def close_clients() -> None:
+    global _client, _async_client
+    if _client is not None:
+        _client.close()
+        _client = None
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
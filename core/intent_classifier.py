@@ -1,16 +1,13 @@
-import re
-from statistics import mean
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from core.static_data import (
-    get_profile_data, get_loan_details, get_human_context, get_other,
-    update_profile, make_payment, get_payment_history, payment_action,
-    get_emi_breakdown, get_due_date_extension_policy, get_prepayment_info,
-    get_partial_payment_policy, get_account_linking_info,
-    get_notification_preferences, get_penalty_waiver_policy,
-    get_topup_loan_info, get_general_help, reminder_request,
-    fee_interest_info, security_query, faq_info_request, handle_yes_or_no
-)
+import re, logging, os, time
+import numpy as np
+from core.vectorizers import make_vectorizer, fingerprint, INTENT_VECTORIZER, VECTORIZERS
+from core.intent_index import definitions_hash, read_index, write_index
+from core.intents import INTENTS
+
+logger = logging.getLogger(__name__)
+
+# compiled intent model artifact (core.build_intent_model); shared between worker processes
+INTENT_INDEX_PATH = os.getenv("INTENT_INDEX_PATH")
 
 
 class IntentClassifier:
@@ -19,471 +16,258 @@ class IntentClassifier:
     Fallback to RAG retrieval if no strong intent is found.
     """
 
-    def __init__(self):
-        self.intents = {
-           "make_payment_upi": {
-        "examples": [
-            "Pay via UPI",
-            "Use Google Pay",
-            "Send payment through UPI"
-        ],
-        "keywords": ["upi", "google pay", "phonepe", "paytm", "payment"],
-        "handler": make_payment
-    },
-    "make_payment_netbanking": {
-        "examples": [
-            "Pay via net banking",
-            "Use my bank portal to pay",
-            "Transfer EMI online"
-        ],
-        "keywords": ["net banking", "bank transfer", "payment"],
-        "handler": make_payment
-    },
-    "make_payment_card": {
-        "examples": [
-            "Pay using debit card",
-            "Pay via credit card",
-            "Use card to pay EMI"
-        ],
-        "keywords": ["debit card", "credit card", "card payment"],
-        "handler": make_payment
-    },
-    "make_payment_cash": {
-        "examples": [
-            "Pay cash at branch",
-            "I’ll pay in cash",
-            "Offline payment for EMI"
-        ],
-        "keywords": ["cash", "branch", "offline payment"],
-        "handler": make_payment
-    },
-    "schedule_payment": {
-        "examples": [
-            "Set EMI for tomorrow",
-            "Pay next week automatically",
-            "Schedule EMI payment"
-        ],
-        "keywords": ["schedule", "remind", "auto pay"],
-        "handler": payment_action
-    },
-    "not_willing_to_pay": {
-        "examples": [
-            "I can't pay today",
-            "I don’t want to pay",
-            "I will not pay this month",
-            "I’ll skip this payment"
-        ],
-        "keywords": ["not pay", "don’t want", "skip payment", "later"],
-        "handler": payment_action
-    },
-    "reminder_setup": {
-        "examples": [
-            "Remind me before EMI",
-            "Set SMS reminder",
-            "Notify me about payment"
-        ],
-        "keywords": ["remind", "notification", "alert"],
-        "handler": reminder_request
-    },
-    "make_payment_qr": {
-    "examples": [
-        "I want to make payment using QR code",
-        "Provide QR code",
-        "I will scan QR to complete payment",
-        "I will se QR payment"
-    ],
-    "keywords": ["qr", "scan", "payment"],
-    "handler": make_payment
-},
-"schedule_auto_debit": {
-    "examples": [
-        "Set up auto debit",
-        "Automatically pay EMI every month",
-        "Recurring payment setup"
-    ],
-    "keywords": ["auto debit", "recurring", "automatic"],
-    "handler": payment_action
-},
-# "payment_failed": {
-#     "examples": [
-#         "Payment didn’t go through",
-#         "EMI payment failed",
-#         "Transaction failed"
-#     ],
-#     "keywords": ["failed", "error", "issue"],
-#     "handler": payment_action
-# },
-"payment_success": {
-    "examples": [
-        "Payment completed",
-        "EMI paid successfully",
-        "Transaction successful"
-    ],
-    "keywords": ["success", "completed", "done"],
-    "handler": payment_action
-},
-
-    # =================== LOAN / EMI INTENTS ===================
-    "loan_balance": {
-        "examples": [
-            "Tell me my loan status",
-            "What is the outstanding balance?",
-            "Loan details"
-        ],
-        "keywords": ["loan", "balance", "outstanding"],
-        "handler": get_loan_details
-    },
-    "emi_breakdown": {
-        "examples": [
-            "Show EMI split",
-            "Principal and interest",
-            "EMI breakdown"
-        ],
-        "keywords": ["emi", "breakdown", "principal", "interest", "split"],
-        "handler": get_emi_breakdown
-    },
-    "request_extension": {
-        "examples": [
-            "Can I extend my due date?",
-            "Delay my EMI",
-            "Request extension"
-        ],
-        "keywords": ["extend", "delay", "extension"],
-        "handler": get_due_date_extension_policy
-    },
-    "request_partial_payment": {
-        "examples": [
-            "Can I pay half EMI?",
-            "Partial repayment",
-            "Make partial payment"
-        ],
-        "keywords": ["partial", "half", "installment"],
-        "handler": get_partial_payment_policy
-    },
-    "topup_loan_request": {
-        "examples": [
-            "Can I get a top-up loan?",
-            "Increase my loan amount",
-            "Eligibility for top-up"
-        ],
-        "keywords": ["topup", "extra loan", "increase loan"],
-        "handler": get_topup_loan_info
-    },
-    "prepayment_request": {
-        "examples": [
-            "I want to prepay my loan",
-            "Pay off early",
-            "Prepayment rules"
-        ],
-        "keywords": ["prepay", "early closure", "penalty"],
-        "handler": get_prepayment_info
-    },
-
-    "loan_status_alert": {
-    "examples": [
-        "Alert me if my EMI is due",
-        "Notify about upcoming EMI"
-    ],
-    "keywords": ["alert", "notification", "emi due"],
-    "handler": reminder_request
-},
-"loan_interest_query": {
-    "examples": [
-        "What is my interest rate?",
-        "Current rate for my loan",
-        "Interest on my EMI"
-    ],
-    "keywords": ["interest", "rate", "loan"],
-    "handler": fee_interest_info
-},
-"loan_penalty_query": {
-    "examples": [
-        "How much is the late fee?",
-        "Penalty for delayed EMI"
-    ],
-    "keywords": ["penalty", "late fee", "charges"],
-    "handler": fee_interest_info
-},
-
-    # =================== PROFILE / ACCOUNT INTENTS ===================
-    "view_profile": {
-        "examples": [
-            "Show my profile",
-            "Get my account details",
-            "Check my registered info"
-        ],
-        "keywords": ["profile", "account", "details"],
-        "handler": get_profile_data
-    },
-    "update_email": {
-        "examples": [
-            "Change my email",
-            "Update registered email"
-        ],
-        "keywords": ["email", "update", "change"],
-        "handler": update_profile
-    },
-    "update_phone": {
-        "examples": [
-            "Change my phone number",
-            "Update registered mobile"
-        ],
-        "keywords": ["phone", "mobile", "update", "change"],
-        "handler": update_profile
-    },
-    "update_address": {
-        "examples": [
-            "Update my address",
-            "Change my current address"
-        ],
-        "keywords": ["address", "update", "change"],
-        "handler": update_profile
-    },
-    "link_bank_account": {
-        "examples": [
-            "Add new bank account",
-            "Link my account"
-        ],
-        "keywords": ["link", "bank", "account"],
-        "handler": get_account_linking_info
-    },
-    "unlink_bank_account": {
-        "examples": [
-            "Remove my bank account",
-            "Unlink account"
-        ],
-        "keywords": ["unlink", "bank", "account"],
-        "handler": get_account_linking_info
-    },
-    "security_password_reset": {
-        "examples": [
-            "Forgot password",
-            "Reset password"
-        ],
-        "keywords": ["password", "reset", "forgot"],
-        "handler": security_query
-    },
-    "security_otp_issue": {
-        "examples": [
-            "OTP not received",
-            "Issue with OTP"
-        ],
-        "keywords": ["otp", "issue", "code"],
-        "handler": security_query
-    },
-
-    "update_name": {
-    "examples": [
-        "Change my registered name",
-        "Update account name"
-    ],
-    "keywords": ["name", "update", "change"],
-    "handler": update_profile
-},
-"update_kyc": {
-    "examples": [
-        "Update my KYC details",
-        "Change ID proof"
-    ],
-    "keywords": ["kyc", "id", "update"],
-    "handler": update_profile
-},
-"update_password": {
-    "examples": [
-        "Change my password",
-        "Update login password"
-    ],
-    "keywords": ["password", "change", "update"],
-    "handler": security_query
-},
-
-    # =================== HUMAN / SUPPORT INTENTS ===================
-    "talk_to_agent": {
-        "examples": [
-            "I want to talk to a human",
-            "Connect me to support",
-            "Speak to agent"
-        ],
-        "keywords": ["agent", "human", "representative", "support"],
-        "handler": get_human_context
-    },
-    "general_help_payment": {
-        "examples": [
-            "How to pay EMI?",
-            "Guide me to pay EMI"
-        ],
-        "keywords": ["help", "guide", "payment"],
-        "handler": get_general_help
-    },
-    "general_help_account": {
-        "examples": [
-            "How to update my number?",
-            "How to change address?"
-        ],
-        "keywords": ["help", "guide", "account"],
-        "handler": get_general_help
-    },
-    "faq_info": {
-        "examples": [
-            "Show FAQ",
-            "Support timings?",
-            "Frequently asked questions"
-        ],
-        "keywords": ["faq", "questions", "support"],
-        "handler": faq_info_request
-    },
-
-    "complaint_register": {
-    "examples": [
-        "I want to lodge a complaint",
-        "File a complaint regarding EMI"
-    ],
-    "keywords": ["complaint", "issue", "problem"],
-    "handler": get_human_context
-},
-"feedback_submission": {
-    "examples": [
-        "Submit feedback",
-        "Provide my feedback"
-    ],
-    "keywords": ["feedback", "review", "rate"],
-    "handler": get_human_context
-},
-"technical_support": {
-    "examples": [
-        "I am facing technical issues",
-        "Support for app login",
-        "App not working"
-    ],
-    "keywords": ["technical", "issue", "support", "app"],
-    "handler": get_human_context
-},
-
-    # =================== CONFIRMATION / DENIAL ===================
-    "affirm": {
-        "examples": ["yes", "yeah", "yep", "sure", "of course"],
-        "keywords": ["yes", "yeah", "yep", "sure"],
-        "handler": handle_yes_or_no
-    },
-    "deny": {
-        "examples": ["no", "nope", "not really", "nah"],
-        "keywords": ["no", "nope", "nah"],
-        "handler": handle_yes_or_no
-    },
-
-    "greeting": {
-    "examples": ["hello", "hi", "good morning", "good evening"],
-    "keywords": ["hello", "hi", "hey", "greetings"],
-    "handler": get_other
-},
-"thanks": {
-    "examples": ["thanks", "thank you", "thx", "much appreciated"],
-    "keywords": ["thanks", "thank", "thx"],
-    "handler": get_other
-},
-"small_talk": {
-    "examples": ["How are you?", "What's up?", "Tell me a joke"],
-    "keywords": ["how", "joke", "weather", "chat"],
-    "handler": get_other
-},
-
-"human_context": {
-    "examples": [
-        "how are you",
-        "what's up",
-        "who made you",
-        "hello",
-        "good morning"
-    ],
-    "keywords": ["hi", "hello", "hey", "good morning", "good evening"],
-    "handler": get_human_context
-},
-
-
-    "other": {
-        "examples": ["hello", "thanks", "what's the weather", "random chit-chat"],
-        "keywords": [],
-        "handler": get_other
-    }
-
-        }
+    def __init__(self, vectorizer: str | None = None, index_path: str | None = None):
+        self.vectorizer_name = vectorizer or INTENT_VECTORIZER
+        # "" disables the artifact even when INTENT_INDEX_PATH is set
+        self.index_path = INTENT_INDEX_PATH if index_path is None else index_path
+        self.intents = {name: dict(meta) for name, meta in INTENTS.items()}
 
         self.MAX_SCORE_THRESHOLD = 0.60
         self.BEST_SCORE_THRESHOLD = 0.50
         self.AMBIGUITY_DELTA = 0.08
         self.ACCOUNT_RE = re.compile(r"\b(?:acc(?:ount)?\s*:?\s*)?(\d{4,12})\b")
-
-    def _cosine_similarity(self, text, examples):
-        corpus = [text] + examples
-        vectorizer = TfidfVectorizer().fit(corpus)
-        tfidf_matrix = vectorizer.transform(corpus)
-        sim_scores = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:]).flatten()
-        return sim_scores
+        self.WORD_RE = re.compile(r"\w+")
+        self._build_index()
+
+    def _build_index(self):
+        """Fit one vectorizer (see core.vectorizers) over every intent example
+        and keep a row -> intent mapping, so each request needs a single
+        similarities() call against all examples. With ``index_path`` set the
+        compiled model is loaded from that artifact instead, and (re)built
+        only when it is missing, corrupt or compiled from other definitions."""
+        self.intent_names = list(self.intents.keys())
+        self.source_hash = definitions_hash(self.intents, fingerprint(self.vectorizer_name))
+        self.model_version = self.source_hash[:12]
+
+        if not (self.index_path and self._load_model(self.index_path)):
+            self._fit()
+            if not getattr(self.vectorizer, "complete", True):
+                # e.g. hybrid without its embeddings: serve it, but never save it as the full model
+                logger.warning("Intent model %s is incomplete; not writing %s", self.model_version, self.index_path)
+            elif self.index_path:
+                self.save_model(self.index_path)
+                # reload so this process also serves from the shared mapping
+                self._load_model(self.index_path)
+
+        # start offset of each intent's block of rows, for reduceat
+        self.example_offsets = np.concatenate(([0], np.cumsum(self.example_counts)[:-1]))
+        self._has_examples = self.example_counts > 0
+        self._human_context_idx = self.intent_names.index("human_context")
+
+    def _fit(self):
+        examples, counts = [], []
+        for intent_name in self.intent_names:
+            intent_examples = self.intents[intent_name]["examples"]
+            examples.extend(intent_examples)
+            counts.append(len(intent_examples))
+        groups = np.repeat(np.arange(len(counts)), counts)
+
+        self.vectorizer = make_vectorizer(self.vectorizer_name).fit(examples, groups)
+        self.example_counts = np.asarray(counts)
+        self._build_keyword_index()
+
+    def save_model(self, path):
+        """Write the compiled model (vectorizer state, example layout, keyword
+        table) as a versioned, checksummed artifact; see core.intent_index."""
+        vectorizer_arrays, vectorizer_meta = self.vectorizer.state()
+        arrays = {f"vectorizer.{name}": a for name, a in vectorizer_arrays.items()}
+        arrays["example_counts"] = self.example_counts
+        arrays["keyword_weights"] = self.keyword_weights
+        write_index(path, arrays, {
+            "source_hash": self.source_hash,
+            "model_version": self.model_version,
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "vectorizer_name": self.vectorizer_name,
+            "vectorizer": vectorizer_meta,
+            "intents": [{"name": name, "handler": self.intents[name]["handler"].__name__}
+                        for name in self.intent_names],
+            "keywords": [[list(tokens), ids] for tokens, ids in self.keyword_index.items()],
+            "max_keyword_tokens": self.max_keyword_tokens,
+        })
+        logger.info("Wrote intent model %s to %s", self.model_version, path)
+
+    def _load_model(self, path):
+        if not os.path.exists(path):
+            return False
+        try:
+            arrays, meta = read_index(path)
+        except (ValueError, KeyError, OSError) as e:
+            logger.warning("Unreadable intent model %s (%s); rebuilding", path, e)
+            return False
+        if meta.get("source_hash") != self.source_hash:
+            logger.info("Intent model %s is stale; rebuilding", path)
+            return False
+
+        prefix = "vectorizer."
+        self.vectorizer = VECTORIZERS[self.vectorizer_name].from_state(
+            {name[len(prefix):]: a for name, a in arrays.items() if name.startswith(prefix)},
+            meta["vectorizer"])
+        self.example_counts = arrays["example_counts"]
+        self.keyword_weights = arrays["keyword_weights"]
+        self.keyword_index = {tuple(tokens): ids for tokens, ids in meta["keywords"]}
+        self.max_keyword_tokens = meta["max_keyword_tokens"]
+        logger.info("Loaded intent model %s from %s", self.model_version, path)
+        return True
+
+    def _build_keyword_index(self):
+        """Compile every intent keyword into one table keyed by its word tokens,
+        so a single scan over the message's word n-grams yields the keyword
+        hits of all intents. Matching is on whole words: "hi" no longer
+        fires inside "this" or "which"."""
+        self.keyword_index = {}
+        self.keyword_weights = np.zeros(len(self.intent_names))
+        self.max_keyword_tokens = 1
+        for idx, intent_name in enumerate(self.intent_names):
+            keywords = sorted(set(self.intents[intent_name].get("keywords", [])))
+            if not keywords:
+                continue
+            self.keyword_weights[idx] = 1.0 / len(keywords)
+            for kw in keywords:
+                tokens = tuple(self.WORD_RE.findall(kw.lower()))
+                self.keyword_index.setdefault(tokens, []).append(idx)
+                self.max_keyword_tokens = max(self.max_keyword_tokens, len(tokens))
+
+    def _example_scores(self, texts):
+        """Return (max, avg) cosine similarity per intent, shape (len(texts), n_intents)."""
+        sims = self.vectorizer.similarities(texts)
+        max_scores = np.zeros((len(texts), len(self.intent_names)))
+        avg_scores = np.zeros((len(texts), len(self.intent_names)))
+        offsets = self.example_offsets[self._has_examples]
+        if len(offsets):
+            max_scores[:, self._has_examples] = np.maximum.reduceat(sims, offsets, axis=1)
+            avg_scores[:, self._has_examples] = (np.add.reduceat(sims, offsets, axis=1)
+                                                 / self.example_counts[self._has_examples])
+        return max_scores, avg_scores
+
+    def _scan_keywords(self, text_norm):
+        """
+        Return (keyword_scores, human_kw): the fraction of each intent's
+        keywords present in ``text_norm`` and the first human_context keyword
+        hit (or None).
+        """
+        tokens = self.WORD_RE.findall(text_norm)
+        scores = np.zeros(len(self.intent_names))
+        seen = set()
+        human_kw = None
+        for start in range(len(tokens)):
+            for n in range(1, min(self.max_keyword_tokens, len(tokens) - start) + 1):
+                gram = tuple(tokens[start:start + n])
+                intent_ids = self.keyword_index.get(gram)
+                if intent_ids is None or gram in seen:
+                    continue
+                seen.add(gram)
+                for idx in intent_ids:
+                    scores[idx] += self.keyword_weights[idx]
+                    if idx == self._human_context_idx and human_kw is None:
+                        human_kw = " ".join(gram)
+        return scores, human_kw
+
+    @staticmethod
+    def _normalize(text):
+        return " ".join(text.lower().split())
 
     def classify(self, text):
-        text_norm = " ".join(text.lower().split())
-        results = {}
-
-        print("\n[Classifier] -----------------------------")
-        print(f"[Classifier] Input text: {text_norm}")
+        text_norm = self._normalize(text)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("Input text: %s", text_norm)
 
         # direct keyword check for human context
-        for kw in self.intents["human_context"]["keywords"]:
-            if kw in text_norm:
-                print(f"[Classifier] Matched human keyword '{kw}' → intent=human_context")
-                handler_func = self.intents["human_context"]["handler"]
-                return {"chosen_intent": "human_context", "confidence": 1.0, "handler": handler_func}
-
-        # compute cosine similarity for each intent
-        for intent_name, intent_meta in self.intents.items():
-            scores = self._cosine_similarity(text_norm, intent_meta["examples"])
-            max_example = max(scores) if len(scores) else 0.0
-            avg_example = mean(scores) if len(scores) else 0.0
-
-            keywords = intent_meta.get("keywords", [])
-            if keywords:
-                present = sum(1 for kw in keywords if kw in text_norm)
-                keyword_score = present / len(keywords)
-            else:
-                keyword_score = 0.0
-
-            final_score = 0.7 * max_example + 0.2 * avg_example + 0.1 * keyword_score
-
-            results[intent_name] = {
-                "max_example_score": max_example,
-                "avg_example_score": avg_example,
-                "keyword_score": keyword_score,
-                "final_score": final_score
-            }
-
-            print(f"[Classifier] Intent '{intent_name}': "
-                  f"max={max_example:.3f}, avg={avg_example:.3f}, "
-                  f"kw={keyword_score:.3f}, final={final_score:.3f}")
-
-        ranked = sorted(results.items(), key=lambda kv: kv[1]["final_score"], reverse=True)
-        top_name, top_stats = ranked[0]
-        second_name, second_stats = ranked[1] if len(ranked) > 1 else (None, {"final_score": 0.0})
-
-        print(f"[Classifier] Top candidate: {top_name} (score={top_stats['final_score']:.3f})")
-        if second_name:
-            print(f"[Classifier] 2nd candidate: {second_name} (score={second_stats['final_score']:.3f})")
-
-        if (top_stats["max_example_score"] >= self.MAX_SCORE_THRESHOLD) or \
-           (top_stats["avg_example_score"] >= self.BEST_SCORE_THRESHOLD):
-            if (top_stats["final_score"] - second_stats["final_score"]) < self.AMBIGUITY_DELTA:
+        keyword_scores, kw = self._scan_keywords(text_norm)
+        if kw is not None:
+            logger.info("Matched human keyword '%s' → intent=human_context", kw)
+            handler_func = self.intents["human_context"]["handler"]
+            return {"chosen_intent": "human_context", "confidence": 1.0, "handler": handler_func}
+
+        # cosine similarity against every intent example in one pass
+        max_scores, avg_scores = self._example_scores([text_norm])
+        max_scores, avg_scores = max_scores[0], avg_scores[0]
+        final_scores = 0.7 * max_scores + 0.2 * avg_scores + 0.1 * keyword_scores
+
+        if debug:
+            for idx, intent_name in enumerate(self.intent_names):
+                logger.debug("Intent '%s': max=%.3f, avg=%.3f, kw=%.3f, final=%.3f", intent_name,
+                             max_scores[idx], avg_scores[idx], keyword_scores[idx], final_scores[idx])
+
+        ranked = np.argsort(-final_scores, kind="stable")
+        top = ranked[0]
+        top_name = self.intent_names[top]
+        second_score = final_scores[ranked[1]] if len(ranked) > 1 else 0.0
+
+        if debug:
+            logger.debug("Top candidate: %s (score=%.3f)", top_name, final_scores[top])
+            if len(ranked) > 1:
+                logger.debug("2nd candidate: %s (score=%.3f)", self.intent_names[ranked[1]], second_score)
+
+        if (max_scores[top] >= self.MAX_SCORE_THRESHOLD) or \
+           (avg_scores[top] >= self.BEST_SCORE_THRESHOLD):
+            if (final_scores[top] - second_score) < self.AMBIGUITY_DELTA:
                 chosen = "other"
-                handler_func = self.intents["other"]["handler"]
-                print("[Classifier] Ambiguity detected → defaulting to 'other'")
+                reason = "ambiguous"
             else:
                 chosen = top_name
-                handler_func = self.intents[top_name]["handler"]
-                print(f"[Classifier] Chosen intent: {chosen}")
+                reason = "match"
         else:
             chosen = "other"
-            handler_func = self.intents["other"]["handler"]
-            print("[Classifier] No strong match → fallback to 'other'")
-        print("The handler function is :",handler_func)
-        return {"chosen_intent": chosen, "confidence": top_stats["final_score"], "handler": handler_func}
+            reason = "no strong match"
+        handler_func = self.intents[chosen]["handler"]
+        logger.info("Chosen intent: %s (top=%s, score=%.3f, %s)", chosen, top_name, final_scores[top], reason)
+        return {"chosen_intent": chosen, "confidence": float(final_scores[top]), "handler": handler_func}
+
+    def classify_many(self, texts, top_k=3):
+        """
+        Batch variant of ``classify`` for offline labelling / replays.
+        Scores every message against every intent example with one transform
+        and one sparse product; applies the same thresholds as ``classify``
+        but does not log per message or return handlers.
+        """
+        norms = [self._normalize(t) for t in texts]
+        results = [None] * len(norms)
+
+        scored, keyword_rows = [], []
+        for i, text_norm in enumerate(norms):
+            keyword_scores, human_kw = self._scan_keywords(text_norm)
+            if human_kw is not None:
+                results[i] = {
+                    "text": texts[i],
+                    "chosen_intent": "human_context",
+                    "confidence": 1.0,
+                    "candidates": [{"intent": "human_context", "score": 1.0}]
+                }
+            else:
+                scored.append(i)
+                keyword_rows.append(keyword_scores)
+        if not scored:
+            return results
+
+        max_scores, avg_scores = self._example_scores([norms[i] for i in scored])
+        keyword_scores = np.vstack(keyword_rows)
+        final_scores = 0.7 * max_scores + 0.2 * avg_scores + 0.1 * keyword_scores
+
+        n_keep = min(len(self.intent_names), max(top_k, 2))
+        ranked = np.argsort(-final_scores, axis=1, kind="stable")[:, :n_keep]
+        rows = np.arange(len(scored))
+        top = ranked[:, 0]
+        top_final = final_scores[rows, top]
+        second_final = final_scores[rows, ranked[:, 1]] if n_keep > 1 else np.zeros(len(scored))
+
+        strong = (max_scores[rows, top] >= self.MAX_SCORE_THRESHOLD) | \
+                 (avg_scores[rows, top] >= self.BEST_SCORE_THRESHOLD)
+        unambiguous = (top_final - second_final) >= self.AMBIGUITY_DELTA
+        accepted = strong & unambiguous
+
+        for row, i in enumerate(scored):
+            chosen = self.intent_names[top[row]] if accepted[row] else "other"
+            results[i] = {
+                "text": texts[i],
+                "chosen_intent": chosen,
+                "confidence": float(top_final[row]),
+                "candidates": [
+                    {"intent": self.intent_names[j], "score": float(final_scores[row, j])}
+                    for j in ranked[row, :top_k]
+                ]
+            }
+        return results
 
 
     # ------------------- HANDLERS -------------------
@@ -0,0 +1,97 @@
+"""
+On-disk compiled intent model: the fitted vectorizer state, example -> intent
+layout and keyword table of an IntentClassifier. Built once (see
+core.build_intent_model) and memory-mapped read-only by every worker process,
+so the pages are shared and workers skip the fit.
+
+File layout (little-endian):
+
+    b"INTIDX01" | u64 header length | JSON header | padding | arrays...
+
+The header carries FORMAT_VERSION, each array's dtype, shape and offset
+(64-byte aligned), free-form metadata (including a hash of the intent
+definitions, so a stale model is detected and rebuilt) and a SHA-256 checksum
+over the metadata and array bytes that read_index() verifies.
+"""
+import hashlib, json, mmap, os, struct, tempfile
+from typing import Any, Dict, Tuple
+import numpy as np
+
+MAGIC = b"INTIDX01"
+FORMAT_VERSION = 3
+ALIGN = 64
+
+
+def _aligned(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def definitions_hash(intents: Dict[str, Dict[str, Any]], vectorizer: str) -> str:
+    """Hash of everything the index is derived from."""
+    source = {
+        "format_version": FORMAT_VERSION,
+        "vectorizer": vectorizer,
+        "intents": [[name, meta["examples"], meta.get("keywords", []),
+                     getattr(meta.get("handler"), "__name__", None)] for name, meta in intents.items()],
+    }
+    return hashlib.sha256(json.dumps(source, sort_keys=True).encode()).hexdigest()
+
+
+def _checksum(arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> str:
+    digest = hashlib.sha256(json.dumps(meta, sort_keys=True).encode())
+    for name in sorted(arrays):
+        digest.update(name.encode())
+        digest.update(memoryview(np.ascontiguousarray(arrays[name])).cast("B"))
+    return digest.hexdigest()
+
+
+def write_index(path: str, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> None:
+    """Write atomically (temp file + rename) so concurrent readers never see a partial index."""
+    arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+    layout, offset = {}, 0
+    for name, a in arrays.items():
+        layout[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset}
+        offset = _aligned(offset + a.nbytes)
+    header = json.dumps({"format_version": FORMAT_VERSION, "arrays": layout, "meta": meta,
+                         "checksum": _checksum(arrays, meta)}).encode()
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".intent_index.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for name, a in arrays.items():
+                f.seek(data_start + layout[name]["offset"])
+                f.write(a.tobytes())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_index(path: str, verify: bool = True) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Map the index read-only; returned arrays are views into the shared mapping.
+    Raises ValueError for foreign files, other format versions or a bad checksum."""
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if buf[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not an intent index")
+    (header_len,) = struct.unpack("<Q", buf[len(MAGIC):len(MAGIC) + 8])
+    header = json.loads(buf[len(MAGIC) + 8:len(MAGIC) + 8 + header_len])
+    if header.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"{path} has format version {header.get('format_version')}, expected {FORMAT_VERSION}")
+    data_start = _aligned(len(MAGIC) + 8 + header_len)
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"])) if spec["shape"] else 1
+        arrays[name] = np.frombuffer(buf, dtype=dtype, count=count,
+                                     offset=data_start + spec["offset"]).reshape(spec["shape"])
+    if verify and _checksum(arrays, header["meta"]) != header["checksum"]:
+        raise ValueError(f"{path} failed checksum validation")
+    return arrays, header["meta"]
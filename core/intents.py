@@ -0,0 +1,401 @@
+"""
+Intent definitions for IntentClassifier: example phrases, keywords and the
+core.static_data handler that retrieves data for each intent.
+The compiled model (core.build_intent_model) is derived from these; editing
+them invalidates any existing artifact.
+"""
+from core.static_data import (
+    get_profile_data, get_loan_details, get_human_context, get_other,
+    update_profile, make_payment, get_payment_history, payment_action,
+    get_emi_breakdown, get_due_date_extension_policy, get_prepayment_info,
+    get_partial_payment_policy, get_account_linking_info,
+    get_notification_preferences, get_penalty_waiver_policy,
+    get_topup_loan_info, get_general_help, reminder_request,
+    fee_interest_info, security_query, faq_info_request, handle_yes_or_no
+)
+
+INTENTS = {
+    "make_payment_upi": {
+        "examples": [
+            "Pay via UPI",
+            "Use Google Pay",
+            "Send payment through UPI"
+        ],
+        "keywords": ["upi", "google pay", "phonepe", "paytm", "payment"],
+        "handler": make_payment
+    },
+    "make_payment_netbanking": {
+        "examples": [
+            "Pay via net banking",
+            "Use my bank portal to pay",
+            "Transfer EMI online"
+        ],
+        "keywords": ["net banking", "bank transfer", "payment"],
+        "handler": make_payment
+    },
+    "make_payment_card": {
+        "examples": [
+            "Pay using debit card",
+            "Pay via credit card",
+            "Use card to pay EMI"
+        ],
+        "keywords": ["debit card", "credit card", "card payment"],
+        "handler": make_payment
+    },
+    "make_payment_cash": {
+        "examples": [
+            "Pay cash at branch",
+            "I’ll pay in cash",
+            "Offline payment for EMI"
+        ],
+        "keywords": ["cash", "branch", "offline payment"],
+        "handler": make_payment
+    },
+    "schedule_payment": {
+        "examples": [
+            "Set EMI for tomorrow",
+            "Pay next week automatically",
+            "Schedule EMI payment"
+        ],
+        "keywords": ["schedule", "remind", "auto pay"],
+        "handler": payment_action
+    },
+    "not_willing_to_pay": {
+        "examples": [
+            "I can't pay today",
+            "I don’t want to pay",
+            "I will not pay this month",
+            "I’ll skip this payment"
+        ],
+        "keywords": ["not pay", "don’t want", "skip payment", "later"],
+        "handler": payment_action
+    },
+    "reminder_setup": {
+        "examples": [
+            "Remind me before EMI",
+            "Set SMS reminder",
+            "Notify me about payment"
+        ],
+        "keywords": ["remind", "notification", "alert"],
+        "handler": reminder_request
+    },
+    "make_payment_qr": {
+        "examples": [
+            "I want to make payment using QR code",
+            "Provide QR code",
+            "I will scan QR to complete payment",
+            "I will se QR payment"
+        ],
+        "keywords": ["qr", "scan", "payment"],
+        "handler": make_payment
+    },
+    "schedule_auto_debit": {
+        "examples": [
+            "Set up auto debit",
+            "Automatically pay EMI every month",
+            "Recurring payment setup"
+        ],
+        "keywords": ["auto debit", "recurring", "automatic"],
+        "handler": payment_action
+    },
+    # "payment_failed": {
+    #     "examples": [
+    #         "Payment didn’t go through",
+    #         "EMI payment failed",
+    #         "Transaction failed"
+    #     ],
+    #     "keywords": ["failed", "error", "issue"],
+    #     "handler": payment_action
+    # },
+    "payment_success": {
+        "examples": [
+            "Payment completed",
+            "EMI paid successfully",
+            "Transaction successful"
+        ],
+        "keywords": ["success", "completed", "done"],
+        "handler": payment_action
+    },
+
+    # =================== LOAN / EMI INTENTS ===================
+    "loan_balance": {
+        "examples": [
+            "Tell me my loan status",
+            "What is the outstanding balance?",
+            "Loan details"
+        ],
+        "keywords": ["loan", "balance", "outstanding"],
+        "handler": get_loan_details
+    },
+    "emi_breakdown": {
+        "examples": [
+            "Show EMI split",
+            "Principal and interest",
+            "EMI breakdown"
+        ],
+        "keywords": ["emi", "breakdown", "principal", "interest", "split"],
+        "handler": get_emi_breakdown
+    },
+    "request_extension": {
+        "examples": [
+            "Can I extend my due date?",
+            "Delay my EMI",
+            "Request extension"
+        ],
+        "keywords": ["extend", "delay", "extension"],
+        "handler": get_due_date_extension_policy
+    },
+    "request_partial_payment": {
+        "examples": [
+            "Can I pay half EMI?",
+            "Partial repayment",
+            "Make partial payment"
+        ],
+        "keywords": ["partial", "half", "installment"],
+        "handler": get_partial_payment_policy
+    },
+    "topup_loan_request": {
+        "examples": [
+            "Can I get a top-up loan?",
+            "Increase my loan amount",
+            "Eligibility for top-up"
+        ],
+        "keywords": ["topup", "extra loan", "increase loan"],
+        "handler": get_topup_loan_info
+    },
+    "prepayment_request": {
+        "examples": [
+            "I want to prepay my loan",
+            "Pay off early",
+            "Prepayment rules"
+        ],
+        "keywords": ["prepay", "early closure", "penalty"],
+        "handler": get_prepayment_info
+    },
+
+    "loan_status_alert": {
+        "examples": [
+            "Alert me if my EMI is due",
+            "Notify about upcoming EMI"
+        ],
+        "keywords": ["alert", "notification", "emi due"],
+        "handler": reminder_request
+    },
+    "loan_interest_query": {
+        "examples": [
+            "What is my interest rate?",
+            "Current rate for my loan",
+            "Interest on my EMI"
+        ],
+        "keywords": ["interest", "rate", "loan"],
+        "handler": fee_interest_info
+    },
+    "loan_penalty_query": {
+        "examples": [
+            "How much is the late fee?",
+            "Penalty for delayed EMI"
+        ],
+        "keywords": ["penalty", "late fee", "charges"],
+        "handler": fee_interest_info
+    },
+
+    # =================== PROFILE / ACCOUNT INTENTS ===================
+    "view_profile": {
+        "examples": [
+            "Show my profile",
+            "Get my account details",
+            "Check my registered info"
+        ],
+        "keywords": ["profile", "account", "details"],
+        "handler": get_profile_data
+    },
+    "update_email": {
+        "examples": [
+            "Change my email",
+            "Update registered email"
+        ],
+        "keywords": ["email", "update", "change"],
+        "handler": update_profile
+    },
+    "update_phone": {
+        "examples": [
+            "Change my phone number",
+            "Update registered mobile"
+        ],
+        "keywords": ["phone", "mobile", "update", "change"],
+        "handler": update_profile
+    },
+    "update_address": {
+        "examples": [
+            "Update my address",
+            "Change my current address"
+        ],
+        "keywords": ["address", "update", "change"],
+        "handler": update_profile
+    },
+    "link_bank_account": {
+        "examples": [
+            "Add new bank account",
+            "Link my account"
+        ],
+        "keywords": ["link", "bank", "account"],
+        "handler": get_account_linking_info
+    },
+    "unlink_bank_account": {
+        "examples": [
+            "Remove my bank account",
+            "Unlink account"
+        ],
+        "keywords": ["unlink", "bank", "account"],
+        "handler": get_account_linking_info
+    },
+    "security_password_reset": {
+        "examples": [
+            "Forgot password",
+            "Reset password"
+        ],
+        "keywords": ["password", "reset", "forgot"],
+        "handler": security_query
+    },
+    "security_otp_issue": {
+        "examples": [
+            "OTP not received",
+            "Issue with OTP"
+        ],
+        "keywords": ["otp", "issue", "code"],
+        "handler": security_query
+    },
+
+    "update_name": {
+        "examples": [
+            "Change my registered name",
+            "Update account name"
+        ],
+        "keywords": ["name", "update", "change"],
+        "handler": update_profile
+    },
+    "update_kyc": {
+        "examples": [
+            "Update my KYC details",
+            "Change ID proof"
+        ],
+        "keywords": ["kyc", "id", "update"],
+        "handler": update_profile
+    },
+    "update_password": {
+        "examples": [
+            "Change my password",
+            "Update login password"
+        ],
+        "keywords": ["password", "change", "update"],
+        "handler": security_query
+    },
+
+    # =================== HUMAN / SUPPORT INTENTS ===================
+    "talk_to_agent": {
+        "examples": [
+            "I want to talk to a human",
+            "Connect me to support",
+            "Speak to agent"
+        ],
+        "keywords": ["agent", "human", "representative", "support"],
+        "handler": get_human_context
+    },
+    "general_help_payment": {
+        "examples": [
+            "How to pay EMI?",
+            "Guide me to pay EMI"
+        ],
+        "keywords": ["help", "guide", "payment"],
+        "handler": get_general_help
+    },
+    "general_help_account": {
+        "examples": [
+            "How to update my number?",
+            "How to change address?"
+        ],
+        "keywords": ["help", "guide", "account"],
+        "handler": get_general_help
+    },
+    "faq_info": {
+        "examples": [
+            "Show FAQ",
+            "Support timings?",
+            "Frequently asked questions"
+        ],
+        "keywords": ["faq", "questions", "support"],
+        "handler": faq_info_request
+    },
+
+    "complaint_register": {
+        "examples": [
+            "I want to lodge a complaint",
+            "File a complaint regarding EMI"
+        ],
+        "keywords": ["complaint", "issue", "problem"],
+        "handler": get_human_context
+    },
+    "feedback_submission": {
+        "examples": [
+            "Submit feedback",
+            "Provide my feedback"
+        ],
+        "keywords": ["feedback", "review", "rate"],
+        "handler": get_human_context
+    },
+    "technical_support": {
+        "examples": [
+            "I am facing technical issues",
+            "Support for app login",
+            "App not working"
+        ],
+        "keywords": ["technical", "issue", "support", "app"],
+        "handler": get_human_context
+    },
+
+    # =================== CONFIRMATION / DENIAL ===================
+    "affirm": {
+        "examples": ["yes", "yeah", "yep", "sure", "of course"],
+        "keywords": ["yes", "yeah", "yep", "sure"],
+        "handler": handle_yes_or_no
+    },
+    "deny": {
+        "examples": ["no", "nope", "not really", "nah"],
+        "keywords": ["no", "nope", "nah"],
+        "handler": handle_yes_or_no
+    },
+
+    "greeting": {
+        "examples": ["hello", "hi", "good morning", "good evening"],
+        "keywords": ["hello", "hi", "hey", "greetings"],
+        "handler": get_other
+    },
+    "thanks": {
+        "examples": ["thanks", "thank you", "thx", "much appreciated"],
+        "keywords": ["thanks", "thank", "thx"],
+        "handler": get_other
+    },
+    "small_talk": {
+        "examples": ["How are you?", "What's up?", "Tell me a joke"],
+        "keywords": ["how", "joke", "weather", "chat"],
+        "handler": get_other
+    },
+
+    "human_context": {
+        "examples": [
+            "how are you",
+            "what's up",
+            "who made you",
+            "hello",
+            "good morning"
+        ],
+        "keywords": ["hi", "hello", "hey", "good morning", "good evening"],
+        "handler": get_human_context
+    },
+
+    "other": {
+        "examples": ["hello", "thanks", "what's the weather", "random chit-chat"],
+        "keywords": [],
+        "handler": get_other
+    }
+}
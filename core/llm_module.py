@@ -1,27 +1,102 @@
-import httpx, json
-from typing import List, Dict
+import asyncio, json, os
+from typing import AsyncIterator
+from core.http_client import get_async_client, make_timeout
+from core.session_store import sessions
+from core.context_window import build_messages
+from core.metrics import record_error
+from core.single_flight import SingleFlight, payload_key
+from core.llm_scheduler import llm_scheduler, LLMOverloaded, PRIORITY_DEFAULT
+from core.circuit_breaker import breakers
 
-OLLAMA_URL = "http://localhost:11434/api/chat"
+OLLAMA_URL = os.getenv("OLLAMA_CHAT_URL", "http://localhost:11434/api/chat")
 MODEL_NAME = "gemma3"
+LLM_TIMEOUT = 60
 
-_conversation_history: Dict[str, List[Dict[str, str]]] = {}
+# identical concurrent requests (same model, history and message) share one Ollama call
+llm_flights = SingleFlight("llm")
 
-def call_llm(system_prompt: str, user_message: str, session_id: str = "default") -> str:
-    messages = [{"role": "system", "content": system_prompt}]
-    history = _conversation_history.setdefault(session_id, [])
-    history.append({"role": "user", "content": user_message})
-    messages.extend(history)
+class LLMUnavailable(Exception):
+    """Ollama chat failed or its circuit breaker is open; the caller should fall back."""
+
+async def remember_turn(session_id: str, user_message: str, reply: str) -> None:
+    """Append a user/assistant exchange to the session's LLM history."""
+    await sessions.aappend(session_id, "llm_history", {"role": "user", "content": user_message},
+                           {"role": "assistant", "content": reply})
+
+async def call_llm(system_prompt: str, user_message: str, session_id: str = "default",
+                   priority: int = PRIORITY_DEFAULT) -> str:
+    messages = build_messages(system_prompt, await sessions.aget(session_id, "llm_history"), user_message)
 
     payload = {"model": MODEL_NAME, "messages": messages, "stream": False}
 
-    try:
-        with httpx.Client(timeout=60) as client:
-            resp = client.post(OLLAMA_URL, json=payload)
-            resp.raise_for_status()
-            data = resp.json()
-            reply = (data.get("message", {}).get("content") or "").strip()
-    except Exception as e:
-        reply = f"[LLM ERROR] {e}"
-
-    history.append({"role": "assistant", "content": reply})
+    reply = await llm_flights.do(payload_key(payload), lambda: _post_chat(payload, priority))
+    await remember_turn(session_id, user_message, reply)
     return reply
+
+async def _post_chat(payload: dict, priority: int) -> str:
+    breaker = breakers["llm"]
+    if not breaker.allow():
+        raise LLMUnavailable("circuit breaker open")
+    try:
+        async with llm_scheduler.slot(priority):
+            try:
+                resp = await get_async_client().post(OLLAMA_URL, json=payload, timeout=make_timeout(LLM_TIMEOUT))
+                resp.raise_for_status()
+                data = resp.json()
+            except Exception as e:
+                record_error("llm", e)
+                breaker.record_failure()
+                raise LLMUnavailable(str(e)) from e
+    except (LLMOverloaded, asyncio.CancelledError):
+        breaker.release()
+        raise
+    breaker.record_success()
+    return (data.get("message", {}).get("content") or "").strip()
+
+async def stream_llm(system_prompt: str, user_message: str, session_id: str = "default",
+                     priority: int = PRIORITY_DEFAULT) -> AsyncIterator[str]:
+    """
+    Same as call_llm but with Ollama's streaming NDJSON API: yields content
+    chunks as they arrive and appends the assembled reply to the session
+    history once the stream finishes. Both raise LLMUnavailable instead of
+    recording a failed exchange in the history.
+    """
+    messages = build_messages(system_prompt, await sessions.aget(session_id, "llm_history"), user_message)
+
+    payload = {"model": MODEL_NAME, "messages": messages, "stream": True}
+
+    parts = []
+    async for token in llm_flights.stream(payload_key(payload), lambda: _stream_chat(payload, priority)):
+        parts.append(token)
+        yield token
+
+    await remember_turn(session_id, user_message, "".join(parts).strip())
+
+async def _stream_chat(payload: dict, priority: int) -> AsyncIterator[str]:
+    breaker = breakers["llm"]
+    if not breaker.allow():
+        raise LLMUnavailable("circuit breaker open")
+    try:
+        async with llm_scheduler.slot(priority):
+            try:
+                async with get_async_client().stream("POST", OLLAMA_URL, json=payload,
+                                                     timeout=make_timeout(LLM_TIMEOUT)) as resp:
+                    resp.raise_for_status()
+                    async for line in resp.aiter_lines():
+                        if not line.strip():
+                            continue
+                        chunk = json.loads(line)
+                        token = chunk.get("message", {}).get("content") or ""
+                        if token:
+                            yield token
+                        if chunk.get("done"):
+                            break
+            except Exception as e:
+                record_error("llm", e)
+                breaker.record_failure()
+                raise LLMUnavailable(str(e)) from e
+    except (LLMOverloaded, asyncio.CancelledError, GeneratorExit):
+        # the call never got an answer either way: free a half-open probe
+        breaker.release()
+        raise
+    breaker.record_success()
@@ -0,0 +1,125 @@
+"""
+Admission control in front of Ollama.
+
+At most LLM_MAX_CONCURRENCY calls run at once; the rest wait in a priority
+queue (lower value first, FIFO within a priority) of at most LLM_MAX_QUEUE
+entries. A call that finds the queue full, or waits longer than
+LLM_QUEUE_TIMEOUT seconds for a slot, fails fast with LLMOverloaded, which the
+API turns into 503 + Retry-After. Retry-After is estimated from the queue
+length and a moving average of how long calls hold a slot.
+
+    PRIORITY_END      /end disposition calls
+    PRIORITY_PAYMENT  payment intents
+    PRIORITY_DEFAULT  everything else
+    PRIORITY_LOW      small talk and off-domain messages
+"""
+import asyncio, heapq, itertools, math, os, time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Tuple
+from core.metrics import metrics, span
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "100"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "15"))
+
+PRIORITY_END, PRIORITY_PAYMENT, PRIORITY_DEFAULT, PRIORITY_LOW = range(4)
+
+PAYMENT_INTENTS = {
+    "make_payment", "make_payment_upi", "make_payment_netbanking", "make_payment_card",
+    "make_payment_cash", "make_payment_qr", "schedule_payment", "schedule_auto_debit",
+    "not_willing_to_pay", "reminder_setup", "payment_success", "payment_failed",
+}
+LOW_PRIORITY_INTENTS = {"other", "small_talk", "greeting", "thanks"}
+
+
+def priority_for(intent: str) -> int:
+    if intent in PAYMENT_INTENTS:
+        return PRIORITY_PAYMENT
+    if intent in LOW_PRIORITY_INTENTS:
+        return PRIORITY_LOW
+    return PRIORITY_DEFAULT
+
+
+class LLMOverloaded(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"LLM overloaded ({reason}), retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, max_queue: int = LLM_MAX_QUEUE,
+                 queue_timeout: float = LLM_QUEUE_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        # (priority, arrival, future); the future resolves when a slot is handed over
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+        self._service_seconds = 1.0
+
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil((len(self._waiters) + 1) / self.max_concurrency * self._service_seconds))
+
+    def _reject(self, reason: str) -> None:
+        metrics.inc("llm_rejected_total", reason=reason)
+        raise LLMOverloaded(reason, self.retry_after())
+
+    def check_capacity(self) -> None:
+        """Raise LLMOverloaded now if a new call would be rejected for a full queue."""
+        if self.active >= self.max_concurrency and len(self._waiters) >= self.max_queue:
+            self._reject("queue_full")
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_DEFAULT) -> AsyncIterator[None]:
+        await self._acquire(priority)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * (time.monotonic() - start)
+            self._release()
+
+    async def _acquire(self, priority: int) -> None:
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            return
+        self.check_capacity()
+
+        entry = (priority, next(self._arrivals), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiters, entry)
+        with span("llm_queue"):
+            try:
+                await asyncio.wait_for(asyncio.shield(entry[2]), self.queue_timeout)
+            except asyncio.TimeoutError:
+                if self._abandon(entry):
+                    self._reject("deadline")
+            except asyncio.CancelledError:
+                if not self._abandon(entry):
+                    self._release()
+                raise
+
+    def _abandon(self, entry) -> bool:
+        """Drop a waiter from the queue; False if it was granted a slot meanwhile."""
+        if entry[2].done():
+            return False
+        entry[2].cancel()
+        self._waiters.remove(entry)
+        heapq.heapify(self._waiters)
+        return True
+
+    def _release(self) -> None:
+        # hand the slot straight to the next waiter, so active stays the same
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+llm_scheduler = LLMScheduler()
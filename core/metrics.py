@@ -0,0 +1,150 @@
+"""
+In-process metrics exposed in Prometheus text format at /metrics.
+
+- latency summaries (p50/p95/p99 over the last METRICS_WINDOW observations)
+- labelled counters (requests per intent, errors per type, ...)
+- gauges read from callbacks at scrape time (session store size, cache size, ...)
+
+Per-stage timing spans also record into the current request's timing dict when
+one is active, which main.py turns into a Server-Timing header.
+"""
+import contextvars, os, threading, time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "2048"))
+QUANTILES = (0.5, 0.95, 0.99)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = \
+    contextvars.ContextVar("request_timings", default=None)
+
+
+class MetricsRegistry:
+    def __init__(self, window: int = METRICS_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._help: Dict[str, str] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = defaultdict(lambda: defaultdict(float))
+        self._summaries: Dict[str, Dict[LabelKey, Dict]] = defaultdict(dict)
+        self._gauges: Dict[str, Tuple[str, Callable[[], float]]] = {}
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._counters[name][key] += value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._summaries[name].get(key)
+            if series is None:
+                series = {"window": deque(maxlen=self.window), "sum": 0.0, "count": 0}
+                self._summaries[name][key] = series
+            series["window"].append(value)
+            series["sum"] += value
+            series["count"] += 1
+
+    def gauge(self, name: str, func: Callable[[], float], help_text: str = "") -> None:
+        self._gauges[name] = (help_text, func)
+
+    def quantiles(self, name: str, **labels: str) -> Dict[float, float]:
+        series = self._summaries.get(name, {}).get(tuple(sorted(labels.items())))
+        if not series or not series["window"]:
+            return {}
+        values = sorted(series["window"])
+        return {q: _quantile(values, q) for q in QUANTILES}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+
+        def header(name: str, kind: str, help_text: str = ""):
+            lines.append(f"# HELP {name} {help_text or self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                header(name, "counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_labels(key)} {value:g}")
+
+            for name, series in sorted(self._summaries.items()):
+                header(name, "summary")
+                for key, data in series.items():
+                    values = sorted(data["window"])
+                    for q in QUANTILES:
+                        lines.append(f"{name}{_labels(key + (('quantile', str(q)),))} {_quantile(values, q):.6f}")
+                    lines.append(f"{name}_sum{_labels(key)} {data['sum']:.6f}")
+                    lines.append(f"{name}_count{_labels(key)} {data['count']}")
+
+        for name, (help_text, func) in sorted(self._gauges.items()):
+            try:
+                value = float(func())
+            except Exception:
+                continue
+            header(name, "gauge", help_text)
+            lines.append(f"{name} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _quantile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in key) + "}"
+
+
+metrics = MetricsRegistry()
+metrics.describe("chat_stage_seconds", "Latency of each /chat pipeline stage")
+metrics.describe("chat_requests_total", "Classified chat turns per intent")
+metrics.describe("errors_total", "Errors per upstream and exception type")
+metrics.describe("provisional_disposition_changes_total", "Sessions whose provisional disposition changed, by new value")
+metrics.describe("disposition_predictions_total", "Dispositions by source: local engine, llm or fallback")
+metrics.describe("fallback_replies_total", "Replies served by a fallback because an upstream was unavailable")
+metrics.describe("circuit_breaker_transitions_total", "Circuit breaker state changes per upstream")
+metrics.describe("circuit_breaker_rejected_total", "Calls refused by an open circuit breaker")
+metrics.describe("llm_rejected_total", "LLM calls rejected by the scheduler (queue_full or deadline)")
+metrics.describe("singleflight_calls_total", "Upstream calls by result: leader (sent) or coalesced (shared)")
+metrics.describe("template_replies_total", "Replies rendered from templates instead of the LLM")
+metrics.describe("session_store_evictions_total", "Sessions evicted from the session store, by reason (ttl or lru)")
+metrics.describe("session_store_trimmed_items_total", "Oldest per-session items dropped beyond SESSION_MAX_TURNS")
+metrics.describe("embedding_cache_lookups_total", "Query embedding cache lookups by result")
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a pipeline stage into chat_stage_seconds{stage=...} and the request timings."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe("chat_stage_seconds", elapsed, stage=stage)
+        timings = request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def record_error(upstream: str, error: BaseException) -> None:
+    metrics.inc("errors_total", upstream=upstream, type=type(error).__name__)
@@ -1,48 +1,43 @@
 from core.intent_classifier import IntentClassifier
-from core.llm_module import call_llm
+from core.llm_module import call_llm, stream_llm, remember_turn, LLMUnavailable
 from core.static_data import *
-from core.disposition_model import predict_disposition
-from typing import Dict, Any
-import json, inspect
-from collections import defaultdict
+from core.disposition_model import predict_disposition, DISPOSITION_MIN_CONFIDENCE
+from core.disposition_engine import disposition_engine, export_conversation, CONVERSATION_EXPORT_PATH
+from typing import Dict, Any, List, AsyncIterator, Optional, Tuple
+import json, inspect, asyncio, logging, threading
+from core.session_store import sessions
+from core.response_cache import response_cache
+from core.reply_templates import reply_templates
+from core.prompt_registry import prompt_registry, OFF_DOMAIN_PROMPT
+from core.metrics import metrics, span
+from core.llm_scheduler import llm_scheduler, priority_for
 
-classifier = IntentClassifier()
+logger = logging.getLogger(__name__)
 
-# session-aware stores
-_conversation_history: Dict[str, list] = defaultdict(list)
-_intent_list: Dict[str, list] = defaultdict(list)
+_classifier: IntentClassifier | None = None
+_classifier_lock = threading.Lock()
+
+def get_classifier() -> IntentClassifier:
+    """Build the classifier index on first use (normally during app startup)."""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = IntentClassifier()
+    return _classifier
 
 def build_system_prompt(intent_name: str, retrieved_data: Dict[str, Any] | None = None,
                         off_domain: bool = False) -> str:
-    """Build system prompt for the LLM"""
+    """Build system prompt for the LLM (pre-rendered per intent, see core.prompt_registry)"""
     if off_domain:
-        return """
-You are a helpful financial assistant LLM.
-
-Rules for off-domain queries:
-1) If the user asks anything outside financial/payment context, answer in ONE factual sentence if possible.
-2) After answering, immediately bring the conversation back to loans, EMI, or payments.
-3) Keep your response polite, concise, and professional.
-4) Do not use any structured data for off-domain queries.
-
-Respond in plain text.
-""".strip()
-    else:
-        return f"""
-You are a helpful financial assistant LLM. Follow these rules strictly:
-
-1) Use ONLY the structured information in `retrieved_data` below to answer user queries.
-2) If user asks something outside available data, politely say you don't have that info.
-3) For chit-chat, gently bring the conversation back to loans/profile.
-4) If user requests a human, acknowledge and suggest next steps.
+        return OFF_DOMAIN_PROMPT
+    return prompt_registry.get(intent_name, retrieved_data)
 
-CURRENT_INTENT: {intent_name}
-retrieved_data (JSON):
-{json.dumps(retrieved_data or {}, indent=2)}
-""".strip()
+def warm_prompts() -> None:
+    prompt_registry.warm({name: meta["handler"] for name, meta in get_classifier().intents.items()})
 
 def classify_message(user_input: str) -> Dict[str, Any]:
-    classification = classifier.classify(user_input)
+    classification = get_classifier().classify(user_input)
     return {
         "text": user_input,
         "intent": classification["chosen_intent"],
@@ -50,39 +45,206 @@ def classify_message(user_input: str) -> Dict[str, Any]:
         "handler": classification["handler"]
     }
 
-def process_user_query(user_input: str, session_id: str = "default") -> Dict[str, Any]:
-    print("Processing user input:", user_input)
-
-    if user_input.strip().lower() in ["end", "finish", "bye", "done", "thankyou", "thank you"]:
-        intents_list = [msg["intent"] for msg in _conversation_history[session_id] if "intent" in msg]
-        print("Conversation history: ", _conversation_history[session_id])
-        final_disp = predict_disposition(intents_list)
-        _conversation_history.pop(session_id, None)
-        _intent_list.pop(session_id, None)
-        return {
-            "reply": f"Conversation ended. Final disposition: {final_disp}",
-            "intent": "end_conversation",
-            "disposition": final_disp
+def classify_messages(texts: List[str], top_k: int = 3) -> List[Dict[str, Any]]:
+    return [
+        {
+            "text": r["text"],
+            "intent": r["chosen_intent"],
+            "confidence": r["confidence"],
+            "candidates": r["candidates"]
         }
+        for r in get_classifier().classify_many(texts, top_k=top_k)
+    ]
 
-    msg_data = classify_message(user_input)
-    _conversation_history[session_id].append(msg_data)
-    _intent_list[session_id].append(msg_data["intent"])
+END_WORDS = ["end", "finish", "bye", "done", "thankyou", "thank you"]
+
+def is_end_message(user_input: str) -> bool:
+    return user_input.strip().lower() in END_WORDS
+
+async def track_disposition(session_id: str, intent: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(saved, advanced) disposition state of the session for a classified intent; see record_turn."""
+    saved = await sessions.aget(session_id, "disposition")
+    state = saved[-1] if saved else disposition_engine.new_state()
+    return state, disposition_engine.update(state, intent)
+
+async def record_turn(session_id: str, turn: Dict[str, Any]) -> None:
+    """
+    Save a turn and its disposition state once its reply is settled, so a
+    request rejected with 503 (and the client's retry) counts the intent once.
+    """
+    state = turn["disposition_state"]
+    await sessions.aappend(session_id, "turns", turn["record"])
+    await sessions.aappend(session_id, "disposition", state, keep=1)
+    if state["prediction"]["disposition"] != turn["previous_disposition"]:
+        metrics.inc("provisional_disposition_changes_total", disposition=state["prediction"]["disposition"])
+
+async def end_conversation(session_id: str) -> Dict[str, Any]:
+    saved = await sessions.aget(session_id, "disposition")
+    local = (saved[-1] if saved else disposition_engine.new_state())["prediction"]
+    logger.debug("Tracked disposition for %s: %s", session_id, local)
+    intents_list = []
+    if local["confidence"] < DISPOSITION_MIN_CONFIDENCE or CONVERSATION_EXPORT_PATH:
+        # the intent list is only needed to ask the LLM or to export the conversation
+        intents_list = [msg["intent"] for msg in await sessions.aget(session_id, "turns") if "intent" in msg]
+    with span("predict_disposition"):
+        prediction = await predict_disposition(intents_list, local)
+    final_disp = prediction["disposition"]
+    export_conversation(session_id, intents_list, prediction)
+    await sessions.adelete(session_id)
+    return {
+        "reply": f"Conversation ended. Final disposition: {final_disp}",
+        "intent": "end_conversation",
+        "disposition": final_disp,
+        "disposition_confidence": prediction["confidence"]
+    }
+
+async def prepare_turn(user_input: str, session_id: str) -> Dict[str, Any]:
+    """
+    Classify the message and either render a templated reply
+    (core.reply_templates) or build the system prompt for the LLM. Nothing is
+    saved to the session until record_turn.
+    """
+    # classification is CPU-bound; keep it off the event loop
+    loop = asyncio.get_running_loop()
+    with span("classify_message"):
+        msg_data = await loop.run_in_executor(None, classify_message, user_input)
+    metrics.inc("chat_requests_total", intent=msg_data["intent"])
+    with span("track_disposition"):
+        previous, state = await track_disposition(session_id, msg_data["intent"])
 
     intent = msg_data["intent"]
     handler = msg_data["handler"]
+    turn = {
+        "intent": intent,
+        "record": {"text": msg_data["text"], "intent": intent, "confidence": msg_data["confidence"]},
+        "disposition": state["prediction"],
+        "disposition_state": state,
+        "previous_disposition": previous["prediction"]["disposition"],
+    }
 
+    retrieved_data = None
     if intent != "other":
         # safely call handler (with or without user_input)
-        try:
-            retrieved_data = handler(user_input)
-        except TypeError:
-            retrieved_data = handler()
+        with span("handler"):
+            try:
+                retrieved_data = handler(user_input)
+            except TypeError:
+                retrieved_data = handler()
+
+        with span("render_template"):
+            template_reply = reply_templates.render(intent, msg_data["confidence"], retrieved_data)
+        if template_reply is not None:
+            metrics.inc("template_replies_total", intent=intent)
+            return {**turn, "system_prompt": None, "cache_key": None,
+                    "template_reply": template_reply, "retrieved_data": retrieved_data}
+
         off_domain = False
-        system_prompt = build_system_prompt(intent, retrieved_data, off_domain)
+        with span("build_system_prompt"):
+            system_prompt = build_system_prompt(intent, retrieved_data, off_domain)
     else:
-        system_prompt = build_system_prompt(intent_name=intent, off_domain=True)
+        with span("build_system_prompt"):
+            system_prompt = build_system_prompt(intent_name=intent, off_domain=True)
+
+    cache_key = None
+    # the LLM sees the session's history, so a reply is only determined by the key
+    # (and shareable between sessions) on a session's first LLM exchange
+    if response_cache.enabled_for(intent) and not await sessions.aget(session_id, "llm_history"):
+        cache_key = response_cache.make_key(intent, retrieved_data, user_input)
 
-    llm_reply = call_llm(system_prompt, user_input)
+    return {**turn, "system_prompt": system_prompt, "cache_key": cache_key,
+            "template_reply": None, "retrieved_data": retrieved_data}
+
+async def _cached_reply(turn: Dict[str, Any], user_input: str, session_id: str) -> str | None:
+    """A reply that needs no LLM call: templated, or from the response cache."""
+    if turn["template_reply"] is not None:
+        await remember_turn(session_id, user_input, turn["template_reply"])
+        return turn["template_reply"]
+    if turn["cache_key"] is None:
+        return None
+    reply = response_cache.get(turn["cache_key"])
+    if reply is not None:
+        await remember_turn(session_id, user_input, reply)
+    return reply
+
+def _store_reply(turn: Dict[str, Any], reply: str) -> None:
+    if turn["cache_key"] is not None and reply:
+        response_cache.put(turn["cache_key"], reply)
+
+def _fallback_reply(turn: Dict[str, Any], error: LLMUnavailable) -> str:
+    """Degraded-mode reply while the LLM is down (see core.circuit_breaker)."""
+    logger.warning("LLM unavailable (%s); answering %s from templates", error, turn["intent"])
+    metrics.inc("fallback_replies_total", upstream="llm")
+    return reply_templates.fallback(turn["intent"], turn["retrieved_data"])
+
+async def process_user_query(user_input: str, session_id: str = "default") -> Dict[str, Any]:
+    logger.info("Processing user input: %s", user_input)
+
+    if is_end_message(user_input):
+        return await end_conversation(session_id)
+
+    turn = await prepare_turn(user_input, session_id)
+    degraded = False
+    llm_reply = await _cached_reply(turn, user_input, session_id)
+    if llm_reply is None:
+        try:
+            with span("call_llm"):
+                llm_reply = await call_llm(turn["system_prompt"], user_input, session_id,
+                                           priority=priority_for(turn["intent"]))
+            _store_reply(turn, llm_reply)
+        except LLMUnavailable as e:
+            llm_reply, degraded = _fallback_reply(turn, e), True
+    await record_turn(session_id, turn)
+
+    return {"reply": llm_reply, "intent": turn["intent"], "degraded": degraded,
+            "disposition": turn["disposition"]["disposition"],
+            "disposition_confidence": turn["disposition"]["confidence"]}
+
+async def stream_user_query(user_input: str, session_id: str = "default") -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of process_user_query. Awaiting it classifies the turn and
+    raises LLMOverloaded if the reply needs the LLM and its queue is full, so the
+    caller can still answer 503; iterating the result yields {"event": "meta"}
+    with the intent, then {"event": "token"} per LLM chunk, and finally
+    {"event": "done"} carrying the same payload process_user_query would return.
+    """
+    logger.info("Processing user input (stream): %s", user_input)
+
+    if is_end_message(user_input):
+        return _single_event({"event": "done", **(await end_conversation(session_id))})
+
+    turn = await prepare_turn(user_input, session_id)
+    reply = await _cached_reply(turn, user_input, session_id)
+    if reply is None:
+        llm_scheduler.check_capacity()
+    return _stream_turn(turn, reply, user_input, session_id)
+
+async def _single_event(event: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    yield event
+
+async def _stream_turn(turn: Dict[str, Any], reply: Optional[str], user_input: str,
+                       session_id: str) -> AsyncIterator[Dict[str, Any]]:
+    yield {"event": "meta", "intent": turn["intent"], "disposition": turn["disposition"]["disposition"]}
+
+    degraded = False
+    if reply is not None:
+        yield {"event": "token", "token": reply}
+    else:
+        parts = []
+        try:
+            with span("stream_llm"):
+                async for token in stream_llm(turn["system_prompt"], user_input, session_id,
+                                              priority=priority_for(turn["intent"])):
+                    parts.append(token)
+                    yield {"event": "token", "token": token}
+            reply = "".join(parts).strip()
+            _store_reply(turn, reply)
+        except LLMUnavailable as e:
+            # the done event replaces any partial text the client has shown
+            reply, degraded = _fallback_reply(turn, e), True
+            if not parts:
+                yield {"event": "token", "token": reply}
+    await record_turn(session_id, turn)
 
-    return {"reply": llm_reply, "intent": intent, "disposition": "in_progress"}
+    yield {"event": "done", "reply": reply, "intent": turn["intent"], "degraded": degraded,
+           "disposition": turn["disposition"]["disposition"],
+           "disposition_confidence": turn["disposition"]["confidence"]}
@@ -0,0 +1,87 @@
+"""
+Pre-rendered system prompts, one per intent.
+Every in-domain prompt starts with the same RULES_PREFIX so Ollama can reuse
+the KV-cache for that prefix across intents and sessions; only the
+CURRENT_INTENT line and the compact retrieved_data JSON differ. A rendered
+prompt is reused until the handler returns different data for that intent.
+"""
+import json, threading
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+# intents whose handlers only read data, so warm() may call them at startup;
+# action handlers (payments, profile updates, ...) are never run for warm-up
+WARM_INTENTS = [
+    "loan_balance", "emi_breakdown", "request_extension", "request_partial_payment",
+    "topup_loan_request", "prepayment_request", "loan_interest_query", "loan_penalty_query",
+    "view_profile", "general_help_payment", "general_help_account", "faq_info",
+    "greeting", "thanks", "small_talk",
+]
+
+RULES_PREFIX = """
+You are a helpful financial assistant LLM. Follow these rules strictly:
+
+1) Use ONLY the structured information in `retrieved_data` below to answer user queries.
+2) If user asks something outside available data, politely say you don't have that info.
+3) For chit-chat, gently bring the conversation back to loans/profile.
+4) If user requests a human, acknowledge and suggest next steps.
+""".strip()
+
+OFF_DOMAIN_PROMPT = """
+You are a helpful financial assistant LLM.
+
+Rules for off-domain queries:
+1) If the user asks anything outside financial/payment context, answer in ONE factual sentence if possible.
+2) After answering, immediately bring the conversation back to loans, EMI, or payments.
+3) Keep your response polite, concise, and professional.
+4) Do not use any structured data for off-domain queries.
+
+Respond in plain text.
+""".strip()
+
+
+def render_prompt(intent_name: str, retrieved_data: Any) -> str:
+    data_json = json.dumps(retrieved_data or {}, separators=(",", ":"), ensure_ascii=False, default=str)
+    return f"{RULES_PREFIX}\n\nCURRENT_INTENT: {intent_name}\nretrieved_data (JSON):\n{data_json}"
+
+
+class PromptRegistry:
+    def __init__(self):
+        # intent -> (retrieved_data it was rendered from, prompt)
+        self._prompts: Dict[str, Tuple[Any, str]] = {}
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "renders": 0}
+
+    def get(self, intent_name: str, retrieved_data: Any) -> str:
+        entry = self._prompts.get(intent_name)
+        if entry is not None and entry[0] == retrieved_data:
+            self.metrics["hits"] += 1
+            return entry[1]
+        prompt = render_prompt(intent_name, retrieved_data)
+        with self._lock:
+            self._prompts[intent_name] = (retrieved_data, prompt)
+            self.metrics["renders"] += 1
+        return prompt
+
+    def warm(self, handlers: Dict[str, Callable[[], Any]], intents: Iterable[str] = WARM_INTENTS) -> None:
+        """Render the prompt of each listed intent whose handler takes no arguments."""
+        for intent_name in intents:
+            handler = handlers.get(intent_name)
+            if handler is None:
+                continue
+            try:
+                self.get(intent_name, handler())
+            except TypeError:
+                continue
+
+    def invalidate(self, intent_name: str | None = None) -> None:
+        with self._lock:
+            if intent_name is None:
+                self._prompts.clear()
+            else:
+                self._prompts.pop(intent_name, None)
+
+    def __len__(self) -> int:
+        return len(self._prompts)
+
+
+prompt_registry = PromptRegistry()
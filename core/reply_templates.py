@@ -0,0 +1,123 @@
+"""
+Templated replies for intents whose answer is fully determined by the handler
+output. When the classifier is confident enough (a per-intent threshold), the
+reply is rendered straight from retrieved_data and the LLM is skipped; below
+the threshold, or if the data lacks a template field, the turn falls back to
+the LLM as before.
+
+    REPLY_TEMPLATES_ENABLED=1
+    REPLY_TEMPLATE_INTENTS=greeting,thanks,...          (default: every intent in TEMPLATES)
+    REPLY_TEMPLATE_THRESHOLDS=emi_breakdown=0.6,...     (override per-intent min confidence)
+
+Templates use str.format fields from retrieved_data; list values are joined
+with ", " and a handler returning a plain string is available as {data}.
+fallback() gives the best LLM-free reply during LLM outages; only read-only
+intents (prompt_registry.WARM_INTENTS) answer from the handler data.
+"""
+import logging, os, string
+from typing import Any, Dict, Iterable, Optional
+
+from core.prompt_registry import WARM_INTENTS
+
+REPLY_TEMPLATES_ENABLED = os.getenv("REPLY_TEMPLATES_ENABLED", "1") == "1"
+REPLY_TEMPLATE_INTENTS = os.getenv("REPLY_TEMPLATE_INTENTS", "")
+REPLY_TEMPLATE_THRESHOLDS = os.getenv("REPLY_TEMPLATE_THRESHOLDS", "")
+
+DEGRADED_REPLY = ("Sorry, I can't answer that in detail right now. "
+                  "Please try again in a few minutes.")
+
+logger = logging.getLogger(__name__)
+
+# intent -> (template, minimum classifier confidence); only intents whose reply
+# is fully determined by the handler output (not e.g. yes/no, which needs the history)
+TEMPLATES: Dict[str, tuple] = {
+    "greeting": (
+        "Hello! I can help you with your loan, EMIs, payments and profile. What would you like to do today?",
+        0.60),
+    "thanks": (
+        "You're welcome! Let me know if there is anything else I can help you with on your loan or payments.",
+        0.60),
+    "faq_info": (
+        "Here are some frequently asked topics: {faqs}. Which one would you like to know more about?",
+        0.60),
+    "emi_breakdown": (
+        "Your EMI of ₹{emi_amount:,} is made up of ₹{principal_component:,} principal and "
+        "₹{interest_component:,} interest. Your next EMI is due on {next_due_date}.",
+        0.55),
+}
+
+
+def _parse_thresholds(spec: str) -> Dict[str, float]:
+    thresholds = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        intent, _, value = item.partition("=")
+        thresholds[intent.strip()] = float(value)
+    return thresholds
+
+
+def _fields(retrieved_data: Any) -> Dict[str, Any]:
+    if not isinstance(retrieved_data, dict):
+        return {"data": retrieved_data}
+    return {k: ", ".join(map(str, v)) if isinstance(v, (list, tuple)) else v
+            for k, v in retrieved_data.items()}
+
+
+class ReplyTemplates:
+    def __init__(self, enabled: bool = REPLY_TEMPLATES_ENABLED,
+                 templates: Dict[str, tuple] = TEMPLATES,
+                 intents: Iterable[str] | None = None,
+                 thresholds: Dict[str, float] | None = None):
+        self.enabled = enabled
+        self.templates = {intent: template for intent, (template, _) in templates.items()}
+        self.thresholds = {intent: threshold for intent, (_, threshold) in templates.items()}
+        self.thresholds.update(thresholds or {})
+        self.intents = set(intents) if intents else set(self.templates)
+        self.metrics = {"rendered": 0, "below_threshold": 0, "render_failed": 0}
+        self._formatter = string.Formatter()
+
+    def enabled_for(self, intent: str) -> bool:
+        return self.enabled and intent in self.intents and intent in self.templates
+
+    def render(self, intent: str, confidence: float, retrieved_data: Any) -> Optional[str]:
+        """The templated reply, or None when the LLM should answer instead."""
+        if not self.enabled_for(intent):
+            return None
+        if confidence < self.thresholds[intent]:
+            self.metrics["below_threshold"] += 1
+            return None
+        try:
+            reply = self._formatter.vformat(self.templates[intent], (), _fields(retrieved_data))
+        except (KeyError, IndexError, ValueError, TypeError) as e:
+            logger.warning("Template for %s could not be rendered (%s); using the LLM", intent, e)
+            self.metrics["render_failed"] += 1
+            return None
+        self.metrics["rendered"] += 1
+        return reply
+
+    def fallback(self, intent: str, retrieved_data: Any) -> str:
+        """Reply without the LLM regardless of confidence or REPLY_TEMPLATE_INTENTS:
+        for read-only intents the template, else the handler's own message;
+        DEGRADED_REPLY otherwise, as a handler message for an action (a payment,
+        an extension) may read as if the action went through."""
+        if intent not in WARM_INTENTS:
+            return DEGRADED_REPLY
+        template = self.templates.get(intent)
+        if template is not None:
+            try:
+                return self._formatter.vformat(template, (), _fields(retrieved_data))
+            except (KeyError, IndexError, ValueError, TypeError):
+                pass
+        if isinstance(retrieved_data, str):
+            return retrieved_data
+        if isinstance(retrieved_data, dict) and isinstance(retrieved_data.get("message"), str):
+            return retrieved_data["message"].rstrip(".") + "."
+        return DEGRADED_REPLY
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "intents": sorted(self.intents), **self.metrics}
+
+
+reply_templates = ReplyTemplates(
+    intents=[i.strip() for i in REPLY_TEMPLATE_INTENTS.split(",") if i.strip()] or None,
+    thresholds=_parse_thresholds(REPLY_TEMPLATE_THRESHOLDS),
+)
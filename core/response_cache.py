@@ -0,0 +1,94 @@
+"""
+Opt-in cache of LLM replies for stateless, informational intents, where the
+reply is fully determined by the intent, the retrieved data and the message.
+Keyed on intent + hash(retrieved_data) + normalised user text, with LRU + TTL
+eviction and hit/miss counters. Since the LLM also sees the session's history,
+the orchestrator only stores and serves entries for sessions with none yet.
+
+    RESPONSE_CACHE_ENABLED=1
+    RESPONSE_CACHE_INTENTS=emi_breakdown,faq_info,...   (default: CACHEABLE_INTENTS)
+"""
+import hashlib, json, os, re, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "0") == "1"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+
+CACHEABLE_INTENTS = [
+    "emi_breakdown", "faq_info", "loan_balance", "loan_interest_query", "loan_penalty_query",
+    "request_extension", "request_partial_payment", "topup_loan_request", "prepayment_request",
+    "general_help_payment", "general_help_account", "view_profile",
+]
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(_PUNCT_RE.sub(" ", text.lower()).split())
+
+
+class ResponseCache:
+    def __init__(self, enabled: bool = RESPONSE_CACHE_ENABLED,
+                 intents: Iterable[str] = CACHEABLE_INTENTS,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.enabled = enabled
+        self.intents = set(intents)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.metrics = {"hits": 0, "misses": 0, "evicted": 0}
+        # key -> (stored_at, reply), least recently used first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def enabled_for(self, intent: str) -> bool:
+        return self.enabled and intent in self.intents
+
+    def set_intent_enabled(self, intent: str, enabled: bool) -> None:
+        if enabled:
+            self.intents.add(intent)
+        else:
+            self.intents.discard(intent)
+
+    @staticmethod
+    def make_key(intent: str, retrieved_data: Any, user_message: str) -> str:
+        data_hash = hashlib.sha256(
+            json.dumps(retrieved_data, sort_keys=True, default=str).encode()).hexdigest()
+        return f"{intent}|{data_hash}|{normalize_text(user_message)}"
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] >= self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                    self.metrics["evicted"] += 1
+                self.metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.metrics["hits"] += 1
+            return entry[1]
+
+    def put(self, key: str, reply: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), reply)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.metrics["evicted"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        return {"entries": len(self._entries), **self.metrics,
+                "hit_rate": self.metrics["hits"] / lookups if lookups else 0.0}
+
+
+_intents_env = os.getenv("RESPONSE_CACHE_INTENTS")
+response_cache = ResponseCache(
+    intents=[i.strip() for i in _intents_env.split(",") if i.strip()] if _intents_env else CACHEABLE_INTENTS)
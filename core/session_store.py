@@ -0,0 +1,226 @@
+"""
+Session state for the chatbot (classified turns, LLM chat history).
+Every session expires after SESSION_TTL_SECONDS without activity, the store
+keeps at most SESSION_MAX_SESSIONS sessions (least recently used evicted
+first) and each per-session list is capped at SESSION_MAX_TURNS items.
+
+Backends: "memory" (default, per process) and "sqlite" (persistent, can be
+shared by several workers on one host). Select with SESSION_BACKEND.
+Async code should use aget/aappend/adelete, which run the SQLite calls in a
+thread so a lock held by another worker does not stall the event loop.
+"""
+import asyncio, functools, json, os, sqlite3, threading, time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List
+from core.metrics import metrics
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "50"))
+# seconds a SQLite call waits for another worker's write lock before failing
+SESSION_DB_TIMEOUT = float(os.getenv("SESSION_DB_TIMEOUT", "1.0"))
+
+
+class SessionStore(ABC):
+    """Per-session named lists, e.g. store.append(sid, "turns", {...})."""
+
+    # calls may wait on I/O or locks, so the async variants run them in a thread
+    blocking = False
+
+    def __init__(self, ttl_seconds: float = SESSION_TTL_SECONDS,
+                 max_sessions: int = SESSION_MAX_SESSIONS,
+                 max_turns: int = SESSION_MAX_TURNS):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.metrics = {"evicted_ttl": 0, "evicted_lru": 0, "trimmed_items": 0}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def get(self, session_id: str, key: str) -> List[Any]:
+        """Return a copy of the list stored under ``key`` (empty if absent)."""
+
+    @abstractmethod
+    def append(self, session_id: str, key: str, *items: Any, keep: int | None = None) -> None:
+        """Append items to ``key``, trimming the oldest beyond max_turns (or ``keep``;
+        keep=1 makes ``key`` a single replaceable value)."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def stats(self) -> Dict[str, int]:
+        return {"sessions": len(self), **self.metrics}
+
+    def _count(self, name: str, n: int) -> None:
+        if n <= 0:
+            return
+        self.metrics[name] += n
+        if name == "trimmed_items":
+            metrics.inc("session_store_trimmed_items_total", n)
+        else:
+            metrics.inc("session_store_evictions_total", n, reason=name[len("evicted_"):])
+
+    async def _run(self, fn: Callable[[], Any]) -> Any:
+        if not self.blocking:
+            return fn()
+        return await asyncio.get_running_loop().run_in_executor(None, fn)
+
+    async def aget(self, session_id: str, key: str) -> List[Any]:
+        return await self._run(functools.partial(self.get, session_id, key))
+
+    async def aappend(self, session_id: str, key: str, *items: Any, keep: int | None = None) -> None:
+        await self._run(functools.partial(self.append, session_id, key, *items, keep=keep))
+
+    async def adelete(self, session_id: str) -> None:
+        await self._run(functools.partial(self.delete, session_id))
+
+
+class InMemorySessionStore(SessionStore):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # session_id -> {"last_access": ts, "data": {key: list}}, oldest access first
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def _expire(self, now: float) -> None:
+        # entries are ordered by last access, so expired ones sit at the front
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if now - entry["last_access"] < self.ttl_seconds:
+                break
+            del self._sessions[session_id]
+            self._count("evicted_ttl", 1)
+
+    def _touch(self, session_id: str, create: bool):
+        now = time.time()
+        self._expire(now)
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            if not create:
+                return None
+            entry = {"last_access": now, "data": {}}
+            self._sessions[session_id] = entry
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._count("evicted_lru", 1)
+        else:
+            entry["last_access"] = now
+            self._sessions.move_to_end(session_id)
+        return entry
+
+    def get(self, session_id: str, key: str) -> List[Any]:
+        with self._lock:
+            entry = self._touch(session_id, create=False)
+            return list(entry["data"].get(key, [])) if entry else []
+
+    def append(self, session_id: str, key: str, *items: Any, keep: int | None = None) -> None:
+        with self._lock:
+            entry = self._touch(session_id, create=True)
+            values = entry["data"].setdefault(key, [])
+            values.extend(items)
+            overflow = len(values) - (keep or self.max_turns)
+            if overflow > 0:
+                del values[:overflow]
+                if keep is None:
+                    self._count("trimmed_items", overflow)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire(time.time())
+            return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Persistent backend; items must be JSON-serialisable. Only append and
+    delete write: a session's TTL and LRU position count from its last append."""
+
+    blocking = True
+
+    def __init__(self, path: str = SESSION_DB_PATH, timeout: float = SESSION_DB_TIMEOUT, **kwargs):
+        super().__init__(**kwargs)
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_access ON sessions(last_access)")
+
+    def _expire(self, now: float) -> None:
+        cur = self._conn.execute("DELETE FROM sessions WHERE last_access < ?", (now - self.ttl_seconds,))
+        self._count("evicted_ttl", cur.rowcount)
+
+    def _load(self, session_id: str) -> Dict[str, List[Any]] | None:
+        row = self._conn.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get(self, session_id: str, key: str) -> List[Any]:
+        # read-only, so reads never wait for another worker's write lock; expired
+        # rows are skipped here and deleted by the next append
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM sessions WHERE session_id = ? AND last_access >= ?",
+                                     (session_id, time.time() - self.ttl_seconds)).fetchone()
+            return json.loads(row[0]).get(key, []) if row else []
+
+    def append(self, session_id: str, key: str, *items: Any, keep: int | None = None) -> None:
+        with self._lock:
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._expire(now)
+                data = self._load(session_id)
+                is_new = data is None
+                data = data or {}
+                values = data.setdefault(key, [])
+                values.extend(items)
+                overflow = len(values) - (keep or self.max_turns)
+                if overflow > 0:
+                    del values[:overflow]
+                    if keep is None:
+                        self._count("trimmed_items", overflow)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, data, last_access) VALUES (?, ?, ?)",
+                    (session_id, json.dumps(data), now))
+                if is_new:
+                    cur = self._conn.execute("""
+                        DELETE FROM sessions WHERE session_id IN (
+                            SELECT session_id FROM sessions ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                        )""", (self.max_sessions,))
+                    self._count("evicted_lru", cur.rowcount)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions WHERE last_access >= ?",
+                                      (time.time() - self.ttl_seconds,)).fetchone()[0]
+
+
+def create_session_store(backend: str = SESSION_BACKEND) -> SessionStore:
+    if backend == "memory":
+        return InMemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend!r}")
+
+
+sessions = create_session_store()
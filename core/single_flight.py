@@ -0,0 +1,98 @@
+"""
+Single-flight coalescing of identical concurrent upstream calls.
+
+Callers that present the same key while a call for it is in flight share that
+call instead of starting their own; only the first ("leader") reaches Ollama.
+The shared call runs as its own task, so a caller that disconnects does not
+cancel it for the others. Streams are fanned out: every subscriber receives
+all chunks from the start, including ones produced before it joined.
+
+An exception from the shared call is raised in every caller.
+
+The key should cover the whole upstream request (see payload_key), so shared
+results are exactly what each caller would have received on its own.
+
+    LLM_COALESCE_ENABLED=1
+"""
+import asyncio, hashlib, json, os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+from core.metrics import metrics
+
+LLM_COALESCE_ENABLED = os.getenv("LLM_COALESCE_ENABLED", "1") == "1"
+
+
+def payload_key(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+class _Stream:
+    def __init__(self):
+        self.parts: List[Any] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.changed = asyncio.Condition()
+
+
+class SingleFlight:
+    def __init__(self, name: str, enabled: bool = LLM_COALESCE_ENABLED):
+        self.name = name
+        self.enabled = enabled
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _Stream] = {}
+
+    def _count(self, mode: str, coalesced: bool) -> None:
+        metrics.inc("singleflight_calls_total", upstream=self.name, mode=mode,
+                    result="coalesced" if coalesced else "leader")
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.enabled:
+            return await fn()
+        task = self._calls.get(key)
+        self._count("call", task is not None)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def stream(self, key: str, source: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        if not self.enabled:
+            async for part in source():
+                yield part
+            return
+        flight = self._streams.get(key)
+        self._count("stream", flight is not None)
+        if flight is None:
+            flight = self._streams[key] = _Stream()
+            asyncio.ensure_future(self._pump(key, flight, source()))
+
+        seen = 0
+        while True:
+            async with flight.changed:
+                await flight.changed.wait_for(lambda: len(flight.parts) > seen or flight.done)
+                parts, done = flight.parts[seen:], flight.done
+            for part in parts:
+                yield part
+            seen += len(parts)
+            if done and seen == len(flight.parts):
+                if flight.error is not None:
+                    raise flight.error
+                return
+
+    async def _pump(self, key: str, flight: _Stream, source: AsyncIterator[Any]) -> None:
+        try:
+            async for part in source:
+                async with flight.changed:
+                    flight.parts.append(part)
+                    flight.changed.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            # later callers start a fresh call rather than replaying a finished one
+            self._streams.pop(key, None)
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._streams)
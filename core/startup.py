@@ -0,0 +1,88 @@
+"""
+Cold-start handling for scale-to-zero deployments.
+
+warm_up() runs in the FastAPI lifespan: it builds the classifier index and the
+prompt registry before the app reports ready, then opens a pooled connection
+to Ollama (and optionally pre-loads the models with keep_alive) in the
+background. startup_state feeds /ready and the startup gauges on /metrics.
+"""
+import asyncio, logging, os, time
+from typing import Any, Dict, Optional
+import httpx
+
+# imported at the top of main.py, so this is close to process start
+PROCESS_START = time.time()
+
+OLLAMA_PRELOAD = os.getenv("OLLAMA_PRELOAD", "0") == "1"
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+logger = logging.getLogger(__name__)
+
+startup_state: Dict[str, Any] = {
+    "ready": False,
+    "startup_seconds": None,
+    "ollama": "pending",
+    "time_to_first_chat_seconds": None,
+    "intent_model_version": None,
+}
+
+_background: Optional[asyncio.Task] = None
+
+
+async def _warm_ollama() -> None:
+    from core.http_client import get_async_client
+    from core import llm_module, disposition_model
+
+    client = get_async_client()
+    try:
+        # opens a keep-alive connection in the shared pool
+        resp = await client.get(str(httpx.URL(llm_module.OLLAMA_URL).join("/api/version")), timeout=10)
+        resp.raise_for_status()
+        if OLLAMA_PRELOAD:
+            # an empty request makes Ollama load the model and keep it resident
+            await client.post(llm_module.OLLAMA_URL, json={
+                "model": llm_module.MODEL_NAME, "messages": [], "keep_alive": OLLAMA_KEEP_ALIVE})
+            await client.post(disposition_model.OLLAMA_URL, json={
+                "model": disposition_model.MODEL_NAME, "keep_alive": OLLAMA_KEEP_ALIVE})
+        startup_state["ollama"] = "preloaded" if OLLAMA_PRELOAD else "connected"
+    except Exception as e:
+        logger.warning("Ollama warm-up failed: %s", e)
+        startup_state["ollama"] = f"unavailable: {type(e).__name__}"
+
+
+def prepare_workers() -> None:
+    """
+    Run once in the parent before forking several uvicorn workers: defaults the
+    session store to the shared SQLite backend and builds (if stale) the intent
+    model artifact that every worker then memory-maps instead of fitting its own.
+    """
+    os.environ.setdefault("SESSION_BACKEND", "sqlite")
+    index_path = os.environ.setdefault("INTENT_INDEX_PATH", "intent_index.bin")
+    from core.intent_classifier import IntentClassifier
+    IntentClassifier(index_path=index_path)
+
+
+async def warm_up() -> None:
+    from core.orchestrator import get_classifier, warm_prompts
+
+    global _background
+    t0 = time.perf_counter()
+    classifier = await asyncio.get_running_loop().run_in_executor(None, get_classifier)
+    startup_state["intent_model_version"] = classifier.model_version
+    warm_prompts()
+    startup_state["ready"] = True
+    startup_state["startup_seconds"] = round(time.time() - PROCESS_START, 3)
+    logger.info("Startup complete in %.3fs (warm-up %.3fs)",
+                startup_state["startup_seconds"], time.perf_counter() - t0)
+    _background = asyncio.create_task(_warm_ollama())
+
+
+async def shutdown() -> None:
+    if _background is not None and not _background.done():
+        _background.cancel()
+
+
+def mark_chat_served() -> None:
+    if startup_state["time_to_first_chat_seconds"] is None:
+        startup_state["time_to_first_chat_seconds"] = round(time.time() - PROCESS_START, 3)
+        logger.info("Time to first successful /chat: %.3fs", startup_state["time_to_first_chat_seconds"])
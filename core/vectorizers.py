@@ -0,0 +1,349 @@
+"""
+Text vectorizer backends for IntentClassifier. Each is fitted once on the
+intent examples (with the intent index of every example) and then scores
+messages against every example with one call:
+
+    similarities(texts) -> ndarray of shape (len(texts), n_examples)
+
+holding the cosine similarity of each message with each example.
+
+- "tfidf":  word unigrams (scikit-learn's tokenizer) weighted with the
+            per-intent idf of IntentIdfIndex: the same scores as refitting a
+            TfidfVectorizer on each intent's examples plus the message.
+- "hashed": NumPy-only; features are hashed into a fixed space, so neither
+            scikit-learn nor scipy is imported. With analyzer="word" it
+            reproduces the tfidf scores (up to hash collisions); "char_wb"
+            uses character n-grams inside word boundaries, which tolerates
+            typos and inflections.
+- "embedding": dense sentence embeddings searched through an ANN index
+            (core.embeddings), which matches paraphrases that share no words
+            with any example.
+- "hybrid": weighted sum of "tfidf" and "embedding" similarities
+            (EMBEDDING_WEIGHT); falls back to tfidf alone if the embedding
+            provider is unreachable, including at fit time, when the
+            examples are embedded again every EMBEDDING_RETRY_SECONDS until
+            it answers (`complete` is False meanwhile, and the state must
+            not be saved).
+
+Select with INTENT_VECTORIZER (and INTENT_VECTORIZER_ANALYZER for "hashed").
+state() / from_state() export and restore a fitted backend as NumPy arrays
+plus JSON metadata, for the on-disk index in core.intent_index; fingerprint()
+names the settings a fitted state depends on.
+"""
+import logging, os, re, threading, time, zlib
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np
+from core import embeddings
+
+INTENT_VECTORIZER = os.getenv("INTENT_VECTORIZER", "tfidf")
+INTENT_VECTORIZER_ANALYZER = os.getenv("INTENT_VECTORIZER_ANALYZER", "word")
+HASHED_N_FEATURES = int(os.getenv("HASHED_N_FEATURES", str(2 ** 18)))
+EMBEDDING_WEIGHT = float(os.getenv("EMBEDDING_WEIGHT", "0.5"))
+# how often "hybrid" retries embedding the examples after the provider was unreachable
+EMBEDDING_RETRY_SECONDS = float(os.getenv("EMBEDDING_RETRY_SECONDS", "60"))
+
+logger = logging.getLogger(__name__)
+
+# same default token pattern as scikit-learn
+TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+
+class IntentIdfIndex:
+    """
+    Cosine similarity of a message with every example under the idf the
+    classifier has always used: refitted per intent on that intent's examples
+    plus the message itself (smooth idf, l2 norm, as TfidfVectorizer). The
+    per-intent document frequencies are precomputed, so a message costs one
+    pass over the inverted-index entries of its own features, for all intents.
+
+    Features are integer ids (vocabulary index or hash bucket); features no
+    example contains only add to the message's length.
+    """
+
+    ARRAYS = ("groups", "base_sq", "oov_sq", "indptr", "rows", "dot", "norm_delta",
+              "group_indptr", "group_ids", "group_delta")
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def build(cls, example_counts: List[Dict[int, int]], groups: Sequence[int], n_features: int) -> "IntentIdfIndex":
+        groups = np.asarray(groups, dtype=np.int64)
+        sizes = np.bincount(groups) if len(groups) else np.zeros(0, dtype=np.int64)
+        # each intent's corpus is its examples plus the message: n + 1 documents
+        log_n = np.log(sizes + 2.0)
+
+        df: Dict[Tuple[int, int], int] = {}
+        for counts, group in zip(example_counts, groups):
+            for feature in counts:
+                df[feature, group] = df.get((feature, group), 0) + 1
+
+        def idf(group, docs):
+            return log_n[group] - np.log(docs) + 1
+
+        # a feature's idf is idf(1 + df) when the message lacks it, idf(2 + df) when it has it
+        base_sq = np.zeros(len(example_counts))
+        entries = []
+        for row, (counts, group) in enumerate(zip(example_counts, groups)):
+            for feature, count in counts.items():
+                d = df[feature, group]
+                absent, present = idf(group, 1 + d), idf(group, 2 + d)
+                base_sq[row] += (count * absent) ** 2
+                entries.append((feature, row, count * present ** 2, count ** 2 * (present ** 2 - absent ** 2)))
+        oov_sq = idf(np.arange(len(sizes)), 2) ** 2
+        group_entries = [(feature, group, idf(group, 2 + d) ** 2 - oov_sq[group])
+                         for (feature, group), d in df.items()]
+
+        arrays = {"groups": groups, "base_sq": base_sq, "oov_sq": oov_sq}
+        for prefix, cols, names in (("", entries, ("rows", "dot", "norm_delta")),
+                                    ("group_", group_entries, ("group_ids", "group_delta"))):
+            cols = sorted(cols)
+            features = np.fromiter((c[0] for c in cols), dtype=np.int64, count=len(cols))
+            arrays[f"{prefix}indptr"] = np.searchsorted(features, np.arange(n_features + 1))
+            for i, name in enumerate(names, start=1):
+                dtype = np.int64 if name.endswith(("rows", "ids")) else np.float64
+                arrays[name] = np.fromiter((c[i] for c in cols), dtype=dtype, count=len(cols))
+        return cls(arrays)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    def scores(self, counts: Dict[int, int], total_sq: float) -> np.ndarray:
+        """``counts``: the message's known features; ``total_sq``: sum of squared
+        counts over all its features, known or not."""
+        dot = np.zeros(len(self.groups))
+        example_sq = self.base_sq.copy()
+        message_sq = self.oov_sq * total_sq
+        for feature, count in counts.items():
+            start, end = self.indptr[feature], self.indptr[feature + 1]
+            rows = self.rows[start:end]
+            dot[rows] += count * self.dot[start:end]
+            example_sq[rows] += self.norm_delta[start:end]
+            start, end = self.group_indptr[feature], self.group_indptr[feature + 1]
+            message_sq[self.group_ids[start:end]] += count ** 2 * self.group_delta[start:end]
+        norms = np.sqrt(example_sq * message_sq[self.groups])
+        return np.divide(dot, norms, out=np.zeros_like(dot), where=norms > 0)
+
+
+class SklearnTfidfVectorizer:
+    name = "tfidf"
+
+    def fit(self, examples: List[str], groups: Sequence[int]) -> "SklearnTfidfVectorizer":
+        # sklearn is heavy to import; defer it until an index is actually built
+        from sklearn.feature_extraction.text import CountVectorizer
+        self.vectorizer = CountVectorizer().fit(examples)
+        self._analyze = self.vectorizer.build_analyzer()
+        self.index = IntentIdfIndex.build([self._counts(text)[0] for text in examples], groups,
+                                          len(self.vectorizer.vocabulary_))
+        return self
+
+    def _counts(self, text: str) -> Tuple[Dict[int, int], float]:
+        """(known term id -> count, sum of squared counts of all terms)."""
+        terms: Dict[str, int] = {}
+        for term in self._analyze(text):
+            terms[term] = terms.get(term, 0) + 1
+        vocabulary = self.vectorizer.vocabulary_
+        known = {vocabulary[term]: count for term, count in terms.items() if term in vocabulary}
+        return known, float(sum(count ** 2 for count in terms.values()))
+
+    def similarities(self, texts: List[str]) -> np.ndarray:
+        return np.vstack([self.index.scores(*self._counts(text)) for text in texts]) \
+            if texts else np.zeros((0, len(self.index.groups)))
+
+    def state(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        vocabulary = sorted(self.vectorizer.vocabulary_, key=self.vectorizer.vocabulary_.get)
+        return self.index.state(), {"vocabulary": vocabulary}
+
+    @classmethod
+    def from_state(cls, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> "SklearnTfidfVectorizer":
+        from sklearn.feature_extraction.text import CountVectorizer
+        self = cls()
+        self.vectorizer = CountVectorizer(vocabulary={term: i for i, term in enumerate(meta["vocabulary"])})
+        self.vectorizer.vocabulary_ = self.vectorizer.vocabulary
+        self._analyze = self.vectorizer.build_analyzer()
+        self.index = IntentIdfIndex(arrays)
+        return self
+
+
+class HashedVectorizer:
+    name = "hashed"
+
+    def __init__(self, n_features: int = HASHED_N_FEATURES, analyzer: str = INTENT_VECTORIZER_ANALYZER,
+                 ngram_range: Tuple[int, int] = (3, 5)):
+        if analyzer not in ("word", "char_wb"):
+            raise ValueError(f"Unknown analyzer: {analyzer!r}")
+        self.n_features = n_features
+        self.analyzer = analyzer
+        self.ngram_range = ngram_range
+
+    def _tokens(self, text: str) -> List[str]:
+        words = TOKEN_RE.findall(text.lower())
+        if self.analyzer == "word":
+            return words
+        lo, hi = self.ngram_range
+        grams = []
+        for word in words:
+            padded = f" {word} "
+            for n in range(lo, min(hi, len(padded)) + 1):
+                grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return grams
+
+    def _counts(self, text: str) -> Dict[int, int]:
+        counts: Dict[int, int] = {}
+        for token in self._tokens(text):
+            # crc32 rather than hash(): stable across processes and runs
+            idx = zlib.crc32(token.encode()) % self.n_features
+            counts[idx] = counts.get(idx, 0) + 1
+        return counts
+
+    def fit(self, examples: List[str], groups: Sequence[int]) -> "HashedVectorizer":
+        self.index = IntentIdfIndex.build([self._counts(text) for text in examples], groups, self.n_features)
+        return self
+
+    def state(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        return self.index.state(), {"n_features": self.n_features, "analyzer": self.analyzer,
+                                    "ngram_range": list(self.ngram_range)}
+
+    @classmethod
+    def from_state(cls, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> "HashedVectorizer":
+        self = cls(meta["n_features"], meta["analyzer"], tuple(meta["ngram_range"]))
+        self.index = IntentIdfIndex(arrays)
+        return self
+
+    def similarities(self, texts: List[str]) -> np.ndarray:
+        sims = np.zeros((len(texts), len(self.index.groups)))
+        for i, text in enumerate(texts):
+            counts = self._counts(text)
+            # buckets no example hashed into only add to the message's length
+            sims[i] = self.index.scores(counts, float(sum(c ** 2 for c in counts.values())))
+        return sims
+
+
+class EmbeddingVectorizer:
+    name = "embedding"
+
+    def __init__(self, provider: str = embeddings.EMBEDDING_PROVIDER, model: str = embeddings.EMBEDDING_MODEL):
+        self.provider = provider
+        self.model = model or embeddings.DEFAULT_MODELS[provider]
+        self.embedder = embeddings.CachedEmbedder(embeddings.make_embedder(provider, self.model))
+
+    def fit(self, examples: List[str], groups: Sequence[int] = ()) -> "EmbeddingVectorizer":
+        # examples are embedded once here, bypassing the query cache
+        try:
+            vectors = self.embedder.embedder.embed(examples)
+        except Exception as e:
+            from core.metrics import record_error
+            record_error("embedding", e)
+            raise
+        self.index = embeddings.IVFIndex.build(vectors)
+        return self
+
+    def similarities(self, texts: List[str]) -> np.ndarray:
+        return self.index.search(self.embedder.embed(texts))
+
+    def state(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        arrays = {"vectors": self.index.vectors, "centroids": self.index.centroids,
+                  "list_rows": self.index.list_rows, "list_indptr": self.index.list_indptr}
+        return arrays, {"provider": self.provider, "model": self.model}
+
+    @classmethod
+    def from_state(cls, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> "EmbeddingVectorizer":
+        self = cls(meta["provider"], meta["model"])
+        self.index = embeddings.IVFIndex(arrays["vectors"], arrays["centroids"],
+                                         arrays["list_rows"], arrays["list_indptr"])
+        return self
+
+
+class HybridVectorizer:
+    name = "hybrid"
+
+    def __init__(self, weight: float = EMBEDDING_WEIGHT):
+        self.weight = weight
+        self.lexical = SklearnTfidfVectorizer()
+        self.semantic = EmbeddingVectorizer()
+        self.complete = False
+        self._examples: List[str] = []
+        self._retry_at = 0.0
+        self._fit_lock = threading.Lock()
+
+    def fit(self, examples: List[str], groups: Sequence[int]) -> "HybridVectorizer":
+        self.lexical.fit(examples, groups)
+        self._examples = list(examples)
+        self._fit_semantic()
+        return self
+
+    def _fit_semantic(self) -> None:
+        try:
+            self.semantic.fit(self._examples)
+        except Exception as e:
+            self._retry_at = time.monotonic() + EMBEDDING_RETRY_SECONDS
+            logger.warning("Could not embed the intent examples, using tfidf scores only "
+                           "(retrying in %.0fs): %s", EMBEDDING_RETRY_SECONDS, e)
+            return
+        self.complete = True
+        logger.info("Embedded %d intent examples; hybrid scoring enabled", len(self._examples))
+
+    def similarities(self, texts: List[str]) -> np.ndarray:
+        lexical = self.lexical.similarities(texts)
+        if not self.complete:
+            # one caller retries; the others keep answering from tfidf meanwhile
+            if time.monotonic() >= self._retry_at and self._fit_lock.acquire(blocking=False):
+                try:
+                    if not self.complete:
+                        self._fit_semantic()
+                finally:
+                    self._fit_lock.release()
+            if not self.complete:
+                return lexical
+        try:
+            semantic = self.semantic.similarities(texts)
+        except Exception as e:
+            from core.metrics import record_error
+            logger.warning("Embedding lookup failed, using tfidf scores only: %s", e)
+            record_error("embedding", e)
+            return lexical
+        return (1 - self.weight) * lexical + self.weight * semantic
+
+    def state(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        if not self.complete:
+            raise ValueError("hybrid vectorizer has no embedding index yet")
+        arrays, meta = {}, {}
+        for part in ("lexical", "semantic"):
+            part_arrays, meta[part] = getattr(self, part).state()
+            arrays.update({f"{part}.{k}": v for k, v in part_arrays.items()})
+        return arrays, meta
+
+    @classmethod
+    def from_state(cls, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> "HybridVectorizer":
+        self = cls.__new__(cls)
+        self.weight = EMBEDDING_WEIGHT
+        self.complete = True
+        for part, backend in (("lexical", SklearnTfidfVectorizer), ("semantic", EmbeddingVectorizer)):
+            prefix = f"{part}."
+            setattr(self, part, backend.from_state(
+                {k[len(prefix):]: v for k, v in arrays.items() if k.startswith(prefix)}, meta[part]))
+        return self
+
+
+VECTORIZERS = {"tfidf": SklearnTfidfVectorizer, "hashed": HashedVectorizer,
+               "embedding": EmbeddingVectorizer, "hybrid": HybridVectorizer}
+
+
+def make_vectorizer(name: str = INTENT_VECTORIZER):
+    if name not in VECTORIZERS:
+        raise ValueError(f"Unknown INTENT_VECTORIZER: {name!r}")
+    return VECTORIZERS[name]()
+
+
+def fingerprint(name: str = INTENT_VECTORIZER) -> str:
+    """Backend name plus the settings its fitted state depends on."""
+    settings = []
+    if name == "hashed":
+        settings = [INTENT_VECTORIZER_ANALYZER, HASHED_N_FEATURES]
+    elif name in ("embedding", "hybrid"):
+        provider = embeddings.EMBEDDING_PROVIDER
+        settings = [provider, embeddings.EMBEDDING_MODEL or embeddings.DEFAULT_MODELS.get(provider)]
+        if provider == "local":
+            settings.append(embeddings.EMBEDDING_DIM)
+    return ":".join(str(part) for part in [name] + settings)
@@ -0,0 +1,106 @@
+"""
+Train and evaluate the local disposition engine (core.disposition_engine).
+
+    python -m evaluation.disposition eval                                  # rules vs model (cross-validated)
+    python -m evaluation.disposition train --output disposition_model.npz  # fit on all rows
+    python -m evaluation.disposition eval --model disposition_model.npz --data conversations.jsonl
+
+Rows are JSON lines of {"intents": [...], "disposition": ...}: the labelled
+sample in evaluation/conversations.jsonl, or conversations exported with
+CONVERSATION_EXPORT_PATH once their labels have been reviewed. "coverage" is
+the share of conversations the engine answers without the LLM at
+--threshold (DISPOSITION_MIN_CONFIDENCE), with the accuracy on those.
+"""
+import argparse, json, os, time
+from collections import Counter
+from typing import Dict, List
+
+DEFAULT_DATA = os.path.join(os.path.dirname(__file__), "conversations.jsonl")
+
+
+def load_conversations(path: str = DEFAULT_DATA) -> List[Dict]:
+    with open(path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [row for row in rows if row.get("disposition") and row.get("source") != "fallback"]
+
+
+def train(rows: List[Dict], C: float = 10.0):
+    from sklearn.linear_model import LogisticRegression
+    import numpy as np
+    from core.disposition_engine import DispositionModel, features
+    from core.intents import INTENTS
+
+    vocabulary = list(INTENTS)
+    index = {name: i for i, name in enumerate(vocabulary)}
+    X = np.stack([features(row["intents"], index) for row in rows])
+    y = [row["disposition"] for row in rows]
+    clf = LogisticRegression(C=C, max_iter=2000).fit(X, y)
+    return DispositionModel(list(clf.classes_), vocabulary, clf.coef_, clf.intercept_)
+
+
+def evaluate(rows: List[Dict], predict, threshold: float) -> Dict:
+    labels, predictions, confidences, latencies = [], [], [], []
+    for row in rows:
+        t0 = time.perf_counter()
+        result = predict(row["intents"])
+        latencies.append(time.perf_counter() - t0)
+        labels.append(row["disposition"])
+        predictions.append(result["disposition"])
+        confidences.append(result["confidence"])
+
+    covered = [gold == pred for gold, pred, conf in zip(labels, predictions, confidences) if conf >= threshold]
+    latencies.sort()
+    confusion = Counter((gold, pred) for gold, pred in zip(labels, predictions) if gold != pred)
+    return {
+        "conversations": len(rows),
+        "accuracy": round(sum(g == p for g, p in zip(labels, predictions)) / len(rows), 4),
+        "coverage": round(len(covered) / len(rows), 4),
+        "covered_accuracy": round(sum(covered) / len(covered), 4) if covered else None,
+        "p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+        "confusion": {f"{gold} -> {pred}": n for (gold, pred), n in confusion.most_common()},
+    }
+
+
+def cross_validate(rows: List[Dict], threshold: float, folds: int = 5) -> Dict:
+    """Out-of-fold predictions of a model trained on the other folds."""
+    predictions = {}
+    for k in range(folds):
+        held_out = [i for i in range(len(rows)) if i % folds == k]
+        model = train([row for i, row in enumerate(rows) if i % folds != k])
+        predictions.update({i: model.predict(rows[i]["intents"]) for i in held_out})
+    by_row = iter(predictions[i] for i in range(len(rows)))
+    report = evaluate(rows, lambda _: next(by_row), threshold)
+    del report["p50_us"]
+    return report
+
+
+def main():
+    from core.disposition_engine import DispositionModel, rules_prediction
+    from core.disposition_model import DISPOSITION_MIN_CONFIDENCE
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["train", "eval"])
+    parser.add_argument("--data", default=DEFAULT_DATA)
+    parser.add_argument("--output", default="disposition_model.npz", help="model file written by train")
+    parser.add_argument("--model", help="trained model to evaluate (default: cross-validate a fresh one)")
+    parser.add_argument("--threshold", type=float, default=DISPOSITION_MIN_CONFIDENCE)
+    args = parser.parse_args()
+    rows = load_conversations(args.data)
+
+    if args.command == "train":
+        model = train(rows)
+        model.save(args.output)
+        print(f"trained on {len(rows)} conversations, {len(model.classes)} classes -> {args.output}")
+        return
+
+    reports = {"rules": evaluate(rows, rules_prediction, args.threshold)}
+    if args.model:
+        reports["model"] = evaluate(rows, DispositionModel.load(args.model).predict, args.threshold)
+    else:
+        reports["model (5-fold cv)"] = cross_validate(rows, args.threshold)
+    for name, report in reports.items():
+        print(f"{name}: {json.dumps(report)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Accuracy + latency evaluation of IntentClassifier on a labelled corpus.
+
+    python -m evaluation.evaluate                          # report on evaluation/intents.jsonl
+    python -m evaluation.evaluate --sweep --workers 4      # grid-search the thresholds in parallel
+
+The corpus is JSON lines of {"text": ..., "intent": ...}; labels use the
+classifier's intent names ("other" for off-domain messages).
+"""
+import argparse, itertools, json, os, time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "intents.jsonl")
+
+SWEEP_GRID = {
+    "MAX_SCORE_THRESHOLD": [0.45, 0.50, 0.55, 0.60, 0.65, 0.70],
+    "BEST_SCORE_THRESHOLD": [0.40, 0.45, 0.50, 0.55, 0.60],
+    "AMBIGUITY_DELTA": [0.02, 0.04, 0.06, 0.08, 0.10, 0.12],
+}
+
+
+def load_corpus(path: str = DEFAULT_CORPUS) -> List[Dict[str, str]]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def score(labels: List[str], predictions: List[str]) -> Dict:
+    confusion = Counter(zip(labels, predictions))
+    correct = sum(n for (gold, pred), n in confusion.items() if gold == pred)
+    in_domain = [pred for gold, pred in zip(labels, predictions) if gold != "other"]
+    return {
+        "messages": len(labels),
+        "accuracy": correct / len(labels) if labels else 0.0,
+        # in-domain messages the classifier gave up on
+        "fallback_rate": in_domain.count("other") / len(in_domain) if in_domain else 0.0,
+        "confusion": {f"{gold} -> {pred}": n for (gold, pred), n in confusion.most_common() if gold != pred},
+    }
+
+
+def confusion_matrix(labels: List[str], predictions: List[str]) -> Dict[str, Dict[str, int]]:
+    matrix: Dict[str, Dict[str, int]] = {}
+    for gold, pred in zip(labels, predictions):
+        row = matrix.setdefault(gold, {})
+        row[pred] = row.get(pred, 0) + 1
+    return matrix
+
+
+def evaluate(corpus: List[Dict[str, str]], classifier=None) -> Dict:
+    from core.intent_classifier import IntentClassifier
+    classifier = classifier or IntentClassifier()
+
+    labels = [row["intent"] for row in corpus]
+    predictions, latencies = [], []
+    for row in corpus:
+        t0 = time.perf_counter()
+        predictions.append(classifier.classify(row["text"])["chosen_intent"])
+        latencies.append(time.perf_counter() - t0)
+
+    latencies.sort()
+    report = score(labels, predictions)
+    report["confusion_matrix"] = confusion_matrix(labels, predictions)
+    report["latency_ms"] = {
+        "mean": round(sum(latencies) / len(latencies) * 1000, 4),
+        "p50": round(latencies[len(latencies) // 2] * 1000, 4),
+        "p95": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000, 4),
+    }
+    return report
+
+
+_worker = {}
+
+
+def _init_worker(corpus_path: str) -> None:
+    from core.intent_classifier import IntentClassifier
+    _worker["classifier"] = IntentClassifier()
+    _worker["corpus"] = load_corpus(corpus_path)
+
+
+def _evaluate_setting(setting: Dict[str, float]) -> Dict:
+    classifier, corpus = _worker["classifier"], _worker["corpus"]
+    for name, value in setting.items():
+        setattr(classifier, name, value)
+    texts = [row["text"] for row in corpus]
+    t0 = time.perf_counter()
+    predictions = [r["chosen_intent"] for r in classifier.classify_many(texts)]
+    elapsed = time.perf_counter() - t0
+    result = score([row["intent"] for row in corpus], predictions)
+    del result["confusion"]
+    return {**setting, **result, "ms_per_message": round(elapsed / len(texts) * 1000, 4)}
+
+
+def sweep(corpus_path: str, workers: int | None = None) -> List[Dict]:
+    names = list(SWEEP_GRID)
+    settings = [dict(zip(names, values)) for values in itertools.product(*SWEEP_GRID.values())]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(corpus_path,)) as pool:
+        results = list(pool.map(_evaluate_setting, settings, chunksize=8))
+    return sorted(results, key=lambda r: (-r["accuracy"], r["fallback_rate"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--sweep", action="store_true", help="grid-search the classifier thresholds")
+    parser.add_argument("--workers", type=int, default=None, help="processes for --sweep (default: all cores)")
+    parser.add_argument("--top", type=int, default=10, help="settings to print for --sweep")
+    parser.add_argument("--output", help="write the full JSON report here")
+    args = parser.parse_args()
+
+    if args.sweep:
+        results = sweep(args.corpus, args.workers)
+        for r in results[:args.top]:
+            print(json.dumps(r))
+        report = {"sweep": results}
+    else:
+        report = evaluate(load_corpus(args.corpus))
+        print(f"messages:      {report['messages']}")
+        print(f"accuracy:      {report['accuracy']:.3f}")
+        print(f"fallback rate: {report['fallback_rate']:.3f}")
+        print(f"latency (ms):  {report['latency_ms']}")
+        print("top confusions:")
+        for pair, n in list(report["confusion"].items())[:15]:
+            print(f"  {n:3d}  {pair}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
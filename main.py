@@ -1,18 +1,75 @@
 
 
-import os
+import os, json, time
+from core.startup import startup_state, warm_up, shutdown, mark_chat_served, prepare_workers
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse, JSONResponse
 from pathlib import Path
 
 # existing imports...
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Body, Query, Request
+from typing import List
 from fastapi.middleware.cors import CORSMiddleware
+from core.logging_config import setup_logging
+setup_logging()
+
 from models.request_models import ChatRequest, EndRequest
-from models.response_models import ChatResponse, EndResponse
-from core.orchestrator import process_user_query
+from models.response_models import ChatResponse, EndResponse, ClassifyResult
+from core.orchestrator import process_user_query, stream_user_query, classify_messages
+from core.http_client import start_clients, close_clients
+from core.llm_module import llm_flights
+from core.llm_scheduler import llm_scheduler, LLMOverloaded
+from core.circuit_breaker import breakers, CLOSED
+from core.metrics import metrics, request_timings, record_error
+from core.session_store import sessions
+from core.response_cache import response_cache
+from contextlib import asynccontextmanager
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_clients()
+    await warm_up()
+    yield
+    await shutdown()
+    await close_clients()
+
+app = FastAPI(title="Payment Chatbot API", version="1.0.0", lifespan=lifespan)
+
+TIMING_HEADERS = os.getenv("TIMING_HEADERS", "0") == "1"
+CLASSIFY_BATCH_MAX = int(os.getenv("CLASSIFY_BATCH_MAX", "10000"))
 
-app = FastAPI(title="Payment Chatbot API", version="1.0.0")
+metrics.gauge("session_store_sessions", lambda: len(sessions), "Live sessions in the session store")
+metrics.gauge("startup_seconds", lambda: startup_state["startup_seconds"], "Process start to ready")
+metrics.gauge("time_to_first_chat_seconds", lambda: startup_state["time_to_first_chat_seconds"],
+              "Process start to first successful /chat")
+metrics.gauge("response_cache_entries", lambda: response_cache.stats()["entries"], "Entries in the LLM response cache")
+metrics.gauge("llm_calls_in_flight", llm_flights.in_flight, "Distinct Ollama chat calls in flight")
+metrics.gauge("llm_active_calls", lambda: llm_scheduler.active, "Ollama calls holding a scheduler slot")
+metrics.gauge("llm_queue_depth", llm_scheduler.queued, "Ollama calls waiting for a scheduler slot")
+
+@app.exception_handler(LLMOverloaded)
+async def llm_overloaded(request: Request, exc: LLMOverloaded):
+    """Fast 503 instead of waiting out the Ollama timeout when the LLM queue is saturated."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(exc.retry_after)})
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """Adds a Server-Timing header with per-stage durations when TIMING_HEADERS=1
+    or the request sends `X-Debug-Timing: 1`."""
+    if not (TIMING_HEADERS or request.headers.get("x-debug-timing") == "1"):
+        return await call_next(request)
+    timings = {}
+    token = request_timings.set(timings)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        request_timings.reset(token)
+    timings["total"] = time.perf_counter() - start
+    response.headers["Server-Timing"] = ", ".join(
+        f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items())
+    return response
 
 # Mount static folder
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -25,22 +82,74 @@ def home():
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    """Liveness plus circuit breaker state; "degraded" while an upstream breaker is not closed."""
+    upstreams = {name: breaker.snapshot() for name, breaker in breakers.items()}
+    status = "ok" if all(u["state"] == CLOSED for u in upstreams.values()) else "degraded"
+    return {"status": status, "upstreams": upstreams}
+
+@app.get("/ready")
+def ready():
+    """Readiness (classifier index and prompts built); /health only reports liveness."""
+    if not startup_state["ready"]:
+        raise HTTPException(status_code=503, detail=startup_state)
+    return startup_state
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
+async def chat(req: ChatRequest):
     try:
-        result = process_user_query(req.message, session_id=req.session_id)
+        result = await process_user_query(req.message, session_id=req.session_id)
+        if not result.get("degraded"):
+            mark_chat_served()
         return ChatResponse(**result)
+    except LLMOverloaded:
+        raise
     except Exception as e:
+        record_error("chat", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """Server-Sent Events: `meta` (intent), `token` (one per LLM chunk), `done` (ChatResponse),
+    or `error` with `retry_after` if the LLM queue deadline passes mid-stream."""
+    # classify first so only turns that need the LLM can get 503; later overload becomes an error event
+    stream = await stream_user_query(req.message, session_id=req.session_id)
+
+    async def events():
+        try:
+            async for event in stream:
+                name = event.pop("event")
+                if name == "done" and not event.get("degraded"):
+                    mark_chat_served()
+                yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+        except LLMOverloaded as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e), 'retry_after': e.retry_after})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.post("/end", response_model=EndResponse)
-def end(req: EndRequest):
-    result = process_user_query("end", session_id=req.session_id)
+async def end(req: EndRequest):
+    result = await process_user_query("end", session_id=req.session_id)
     return EndResponse(**result)
 
+@app.post("/classify/batch", response_model=List[ClassifyResult])
+def classify_batch(messages: List[str] = Body(..., min_length=1, max_length=CLASSIFY_BATCH_MAX),
+                   top_k: int = Query(default=3, ge=1, le=10)):
+    """Scores the whole batch in one (messages x examples) matrix; split larger jobs
+    into requests of at most CLASSIFY_BATCH_MAX messages (422 otherwise)."""
+    return [ClassifyResult(**r) for r in classify_messages(messages, top_k=top_k)]
+
 if __name__ == "__main__":
     port=int(os.getenv("PORT", 8080))
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    if workers > 1:
+        # workers share the memory-mapped intent index and the SQLite session store
+        prepare_workers()
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
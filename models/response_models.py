@@ -1,11 +1,25 @@
 from pydantic import BaseModel
+from typing import List, Optional
 
 class ChatResponse(BaseModel):
     reply: str
     intent: str
-    disposition: str
+    disposition: str  # provisional until /end
+    disposition_confidence: Optional[float] = None
+    degraded: bool = False
 
 class EndResponse(BaseModel):
     reply: str
     intent: str
     disposition: str
+    disposition_confidence: Optional[float] = None  # None when the LLM decided
+
+class IntentCandidate(BaseModel):
+    intent: str
+    score: float
+
+class ClassifyResult(BaseModel):
+    text: str
+    intent: str
+    confidence: float
+    candidates: List[IntentCandidate]
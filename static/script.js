@@ -16,25 +16,67 @@ async function sendMessage() {
     appendMessage(message, "user");
     userInput.value = "";
 
+    const botDiv = appendMessage("", "bot");
+
     try {
-        const res = await fetch("/chat", {
+        const res = await fetch("/chat/stream", {
             method: "POST",
             headers: { "Content-Type": "application/json" },
             body: JSON.stringify({ message, session_id: SESSION_ID })
         });
+        if (res.status === 503) {
+            botDiv.textContent = `⚠️ The assistant is busy, please try again in ${res.headers.get("Retry-After") || "a few"}s.`;
+            return;
+        }
+        if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
 
-        const data = await res.json();
-        appendMessage(data.reply, "bot");
+        await readEvents(res.body, (event, data) => {
+            if (event === "token") {
+                botDiv.textContent += data.token;
+            } else if (event === "done") {
+                botDiv.textContent = data.reply;
+            } else if (event === "error") {
+                botDiv.textContent = `⚠️ The assistant is busy, please try again in ${data.retry_after}s.`;
+            }
+            chatBox.scrollTop = chatBox.scrollHeight;
+        });
     } catch (error) {
-        appendMessage("⚠️ Error contacting chatbot.", "bot");
+        botDiv.textContent = "⚠️ Error contacting chatbot.";
         console.error(error);
     }
 }
 
+// Parse a Server-Sent Events stream from a fetch() body.
+async function readEvents(body, onEvent) {
+    const reader = body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let sep;
+        while ((sep = buffer.indexOf("\n\n")) !== -1) {
+            const block = buffer.slice(0, sep);
+            buffer = buffer.slice(sep + 2);
+
+            let event = "message", data = "";
+            for (const line of block.split("\n")) {
+                if (line.startsWith("event: ")) event = line.slice(7);
+                else if (line.startsWith("data: ")) data += line.slice(6);
+            }
+            if (data) onEvent(event, JSON.parse(data));
+        }
+    }
+}
+
 function appendMessage(text, sender) {
     const msgDiv = document.createElement("div");
     msgDiv.className = `message ${sender}`;
     msgDiv.textContent = text;
     chatBox.appendChild(msgDiv);
     chatBox.scrollTop = chatBox.scrollHeight;
+    return msgDiv;
 }